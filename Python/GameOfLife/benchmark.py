@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Benchmark suite for the Game of Life step kernels
+
+Runs every registered kernel over a range of board sizes, densities and
+generation counts, checks that they all end on exactly the same board as the
+reference kernel, and reports cells per second and peak memory as JSON or
+CSV.
+
+    python benchmark.py --sizes 100 1024 8192 --generations 10 --json report.json
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from game_of_life import life_step_1, life_step_2
+from bitlife import life_run_bitpacked
+from hashlife import hashlife_advance, hashlife_clear_cache
+from sparselife import SparseLife
+from parlife import life_run_parallel
+from rules import make_life_step
+
+def _stepping(life_step):
+    """Turn a one generation life_step into a run(X, generations) function"""
+    def run(X, generations):
+        for _ in range(generations):
+            X = life_step(X)
+        return X
+    return run
+
+# HashLife's memo tables grow with how random the board is, on random boards
+# beyond this side they take gigabytes and minutes per run
+HASHLIFE_MAX_SIZE = 1024
+
+def _hashlife_run(X, generations):
+    if max(np.shape(X)) > HASHLIFE_MAX_SIZE:
+        raise ValueError("hashlife is only benchmarked up to %d^2 on random boards"
+                         % HASHLIFE_MAX_SIZE)
+    # Start from empty caches so every measurement pays for its own nodes
+    hashlife_clear_cache()
+    return hashlife_advance(X, generations, wrap=True)
+
+# Every kernel is a run(X, generations) function returning the final board.
+# The first one is the reference the others are checked against.
+KERNELS = {
+    'life_step_1': _stepping(life_step_1),
+    'life_step_2': _stepping(life_step_2),
+    'bitpacked': life_run_bitpacked,
+    'sparse': lambda X, generations: SparseLife(X).run(generations),
+    'parallel': life_run_parallel,
+    'hashlife': _hashlife_run,
+    'rule_table': _stepping(make_life_step('B3/S23')),
+}
+
+def register_kernel(name, run):
+    """Add a run(X, generations) kernel to the benchmark"""
+    KERNELS[name] = run
+
+def _measure(run, X, generations, repeat):
+    """Peak memory over one run, then the best wall time over repeat runs"""
+    # Warm up lazy imports, JIT compilation and caches without tracing, so
+    # they don't count towards the peak memory
+    run(X, generations)
+    # tracemalloc slows everything down, so memory gets its own run
+    tracemalloc.start()
+    try:
+        run(X, generations)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = run(X, generations)
+        best = min(best, time.perf_counter() - t0)
+    return np.asarray(result).astype(bool), best, peak
+
+def life_benchmark(kernels=None, sizes=(100, 256, 1024, 4096, 8192),
+                   densities=(0.1, 0.3), generations=(10,), repeat=3, seed=0,
+                   verbose=True):
+    """Benchmark Game of Life kernels against each other
+
+    Parameters
+    ----------
+    kernels : list of string
+        names from KERNELS to run, all of them by default.  The first one is
+        the reference for the bit-for-bit check.
+    sizes : list of integer
+        the side of the square boards
+    densities : list of float
+        the fraction of live cells in the random starting boards
+    generations : list of integer
+        the numbers of generations to run
+    repeat : integer
+        the number of timed runs, the fastest is reported
+    seed : integer
+        seed of the random starting boards
+
+    Returns
+    -------
+    rows : list of dict
+        one row per kernel and setting with 'kernel', 'size', 'density',
+        'generations', 'seconds', 'cells_per_second', 'peak_bytes',
+        'agrees' and 'error' (why the kernel was skipped, or None)
+    """
+    names = list(kernels or KERNELS)
+    rng = np.random.default_rng(seed)
+    rows = []
+    for size in sizes:
+        for density in densities:
+            X = rng.random((size, size)) < density
+            for gens in generations:
+                reference = None
+                for name in names:
+                    row = {'kernel': name, 'size': size, 'density': density,
+                           'generations': gens, 'seconds': None,
+                           'cells_per_second': None, 'peak_bytes': None,
+                           'agrees': None, 'error': None}
+                    try:
+                        result, seconds, peak = _measure(KERNELS[name], X, gens, repeat)
+                    except ValueError as e:
+                        # e.g. hashlife only wraps on power-of-two boards
+                        # and is not run on the largest boards
+                        row['error'] = str(e)
+                    else:
+                        if reference is None:
+                            reference = result
+                        row['seconds'] = seconds
+                        row['cells_per_second'] = size * size * gens / seconds if seconds > 0 else None
+                        row['peak_bytes'] = peak
+                        row['agrees'] = bool(np.array_equal(result, reference))
+                    rows.append(row)
+                    if verbose:
+                        print(_format_row(row), file=sys.stderr)
+    return rows
+
+def _format_row(row):
+    if row['error'] is not None:
+        return "%-12s %6d^2 d=%.2f g=%-5d skipped: %s" % (
+            row['kernel'], row['size'], row['density'], row['generations'], row['error'])
+    return "%-12s %6d^2 d=%.2f g=%-5d %10.3g cells/s %10.3g MB peak %s" % (
+        row['kernel'], row['size'], row['density'], row['generations'],
+        row['cells_per_second'] or 0, row['peak_bytes'] / 1e6,
+        'ok' if row['agrees'] else 'MISMATCH')
+
+def write_json(rows, path):
+    with open(path, 'w') as f:
+        json.dump(rows, f, indent=2)
+
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--kernels', nargs='+', choices=list(KERNELS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 256, 1024, 4096, 8192])
+    parser.add_argument('--densities', nargs='+', type=float, default=[0.1, 0.3])
+    parser.add_argument('--generations', nargs='+', type=int, default=[10])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write the report to this JSON file')
+    parser.add_argument('--csv', help='write the report to this CSV file')
+    args = parser.parse_args()
+
+    rows = life_benchmark(args.kernels, args.sizes, args.densities, args.generations,
+                          args.repeat, args.seed)
+    if args.json:
+        write_json(rows, args.json)
+    if args.csv:
+        write_csv(rows, args.csv)
+    if not args.json and not args.csv:
+        json.dump(rows, sys.stdout, indent=2)
+    if not all(row['agrees'] for row in rows if row['error'] is None):
+        sys.exit(1)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Cycle and stabilization detection for Game of Life runs
+
+Every generation the packed board (see bitlife.py) is reduced to a 64-bit
+polynomial rolling hash.  The hashes of the last few generations are kept,
+and as soon as a hash comes back the board has either settled into a still
+life (period 1) or an oscillator of period p.  From then on the rest of a run
+can be skipped, since generation g equals generation g - p.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from bitlife import pack_board, unpack_board, packed_life_step
+
+HASH_BASE = np.uint64(0x9E3779B97F4A7C15)
+
+_powers_cache = {}
+
+def _powers(n):
+    """HASH_BASE ** (n - 1 - i) modulo 2^64 for i in range(n)"""
+    powers = _powers_cache.get(n)
+    if powers is None:
+        powers = np.empty(n, dtype=np.uint64)
+        p = 1
+        for i in range(n - 1, -1, -1):
+            powers[i] = p
+            p = (p * int(HASH_BASE)) & 0xFFFFFFFFFFFFFFFF
+        _powers_cache[n] = powers
+    return powers
+
+def board_hash(P):
+    """64-bit hash of a packed board
+
+    The words are combined as a polynomial rolling hash modulo 2^64 and the
+    result is passed through the splitmix64 finalizer to mix the high bits
+    back into the low ones.
+    """
+    words = np.ascontiguousarray(P, dtype=np.uint64).ravel()
+    h = int((words * _powers(len(words))).sum(dtype=np.uint64))
+    h ^= h >> 30
+    h = (h * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    h ^= h >> 27
+    h = (h * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return h ^ (h >> 31)
+
+class CycleDetector:
+    """Remember the hashes of recent boards and spot when one comes back
+
+    Parameters
+    ----------
+    max_history : integer
+        the number of recent generations remembered, so the longest period
+        that can be detected
+    """
+
+    def __init__(self, max_history=256):
+        self.max_history = max_history
+        self.seen = {}
+        self.order = deque()
+        self.generation = -1
+        self.period = 0
+        self.start = -1
+
+    def update(self, P):
+        """Add the next generation's packed board, return its period or 0"""
+        self.generation += 1
+        h = board_hash(P)
+        previous = self.seen.get(h)
+        if previous is not None and self.period == 0:
+            self.period = self.generation - previous
+            self.start = previous
+        self.seen[h] = self.generation
+        self.order.append(h)
+        if len(self.order) > self.max_history:
+            old = self.order.popleft()
+            if self.seen.get(old) == self.generation - self.max_history:
+                del self.seen[old]
+        return self.period
+
+def life_run_until_stable(X, generations, max_history=256):
+    """Run the game of life, fast-forwarding once the board starts repeating
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional array showing the game board
+    generations : integer
+        the number of generations to run
+    max_history : integer
+        the longest period that is detected
+
+    Returns
+    -------
+    X : ndarray of bool
+        the board after the given number of generations
+    info : dict
+        'period' : the period of the cycle the board settled into (1 for a
+        still life or a dead board), or 0.  'start' : the first generation of
+        that cycle, or -1.  'stepped' : the generations actually computed.
+    """
+    X = np.asarray(X)
+    assert X.ndim == 2
+    cols = X.shape[1]
+    P = pack_board(X)
+    detector = CycleDetector(max_history)
+    detector.update(P)
+
+    g = 0
+    while g < generations:
+        P = packed_life_step(P, cols)
+        g += 1
+        if detector.update(P):
+            # Generation g equals generation g - period, so only the
+            # remainder of the cycle is left to compute
+            remaining = (generations - g) % detector.period
+            for _ in range(remaining):
+                P = packed_life_step(P, cols)
+            g += remaining
+            break
+
+    info = {'period': detector.period, 'start': detector.start, 'stepped': g}
+    return unpack_board(P, cols), info
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Batched ensembles of many Game of Life boards
+
+A stack of boards shaped (N, rows, cols) is stepped in one vectorized call on
+the bit-packed kernel, without any rendering.  Every board's population is
+recorded, boards that die out or settle into a still life or oscillator are
+detected, and settled boards stop being stepped.
+"""
+
+import numpy as np
+
+from bitlife import pack_board, unpack_board, packed_life_rows
+
+# Number of set bits in every byte value
+POPCOUNT8 = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+def random_ensemble(n, shape, densities, seed=None):
+    """Random boards like the (r > 0.75) seeding, one density per board
+
+    Parameters
+    ----------
+    n : integer
+        the number of boards
+    shape : tuple
+        the (rows, cols) of every board
+    densities : float or array_like
+        the fraction of live cells, either shared or one per board
+    seed : integer
+        seed of the random generator
+
+    Returns
+    -------
+    X : ndarray of bool, shape (n, rows, cols)
+    """
+    rng = np.random.default_rng(seed)
+    densities = np.broadcast_to(np.asarray(densities, dtype=float), (n,))
+    return rng.random((n,) + tuple(shape)) < densities[:, None, None]
+
+def _pack_stack(X):
+    n, rows, cols = X.shape
+    return pack_board(X.reshape(n * rows, cols)).reshape(n, rows, -1)
+
+def _unpack_stack(P, cols):
+    n, rows, words = P.shape
+    return unpack_board(P.reshape(n * rows, words), cols).reshape(n, rows, cols)
+
+def _packed_step_stack(P, cols):
+    """One generation for a stack of packed boards (n, rows, words)"""
+    n, rows, words = P.shape
+    up = np.roll(P, 1, 1).reshape(n * rows, words)
+    down = np.roll(P, -1, 1).reshape(n * rows, words)
+    return packed_life_rows(up, P.reshape(n * rows, words), down, cols).reshape(n, rows, words)
+
+def _population(P):
+    """Number of live cells in every packed board of a stack"""
+    return POPCOUNT8[P.view(np.uint8)].reshape(P.shape[0], -1).sum(axis=1)
+
+def life_step_ensemble(X):
+    """Game of life step for a stack of boards shaped (N, rows, cols)"""
+    X = np.asarray(X).astype(bool)
+    assert X.ndim == 3
+    return _unpack_stack(_packed_step_stack(_pack_stack(X), X.shape[2]), X.shape[2])
+
+def life_ensemble(X, generations, max_period=8, skip_settled=True):
+    """Run a stack of Game of Life boards and gather statistics
+
+    Parameters
+    ----------
+    X : array_like
+        a three-dimensional array (N, rows, cols) of game boards
+    generations : integer
+        the number of generations to run
+    max_period : integer
+        the longest oscillator period that is detected
+    skip_settled : bool
+        stop stepping boards once they died out or started repeating, and
+        fill in their remaining populations and final boards from the cycle
+
+    Returns
+    -------
+    result : dict
+        'board' : ndarray of bool (N, rows, cols), the boards after the last
+        generation.  'population' : ndarray (generations + 1, N), the live
+        cells of every board at every generation.  'extinction' : ndarray
+        (N,), the first generation with no live cells, or -1.  'period' :
+        ndarray (N,), the period of the cycle each board settled into (1 for
+        still lifes and dead boards), or 0 if none was found.  'settled' :
+        ndarray (N,), the first generation of that cycle, or -1.
+    """
+    X = np.asarray(X).astype(bool)
+    assert X.ndim == 3
+    n, rows, cols = X.shape
+
+    P = _pack_stack(X)
+    population = np.zeros((generations + 1, n), dtype=np.int64)
+    population[0] = _population(P)
+    extinction = np.where(population[0] == 0, 0, -1)
+    period = np.where(population[0] == 0, 1, 0)
+    settled = np.where(population[0] == 0, 0, -1)
+    # Generation at which each board was found to repeat
+    detected = settled.copy()
+
+    # The last max_period states of every board, slot g % max_period
+    history = np.zeros((n, max_period) + P.shape[1:], dtype=P.dtype)
+    history[:, 0] = P
+    lags = np.arange(1, max_period + 1)
+
+    for g in range(1, generations + 1):
+        if skip_settled:
+            act = np.nonzero(period == 0)[0]
+            if len(act) == 0:
+                break
+        else:
+            act = np.arange(n)
+        P[act] = _packed_step_stack(P[act], cols)
+        population[g, act] = _population(P[act])
+
+        dead = act[(population[g, act] == 0) & (extinction[act] < 0)]
+        extinction[dead] = g
+
+        # Compare with the states 1 .. max_period generations ago
+        search = act[period[act] == 0]
+        if len(search):
+            slots = (g - lags) % max_period
+            same = (history[search][:, slots] == P[search][:, None]).all(axis=(2, 3))
+            same &= (g - lags >= 0)
+            found = same.any(axis=1)
+            hit = search[found]
+            period[hit] = lags[np.argmax(same[found], axis=1)]
+            settled[hit] = g - period[hit]
+            detected[hit] = g
+        history[act, g % max_period] = P[act]
+
+    if skip_settled:
+        # Settled boards just repeat their cycle from where they stopped
+        for g in range(1, generations + 1):
+            fill = np.nonzero((period > 0) & (detected < g))[0]
+            population[g, fill] = population[g - period[fill], fill]
+        fill = np.nonzero((period > 0) & (detected < generations))[0]
+        same_as = settled[fill] + (generations - detected[fill]) % period[fill]
+        P[fill] = history[fill, same_as % max_period]
+
+    return {'board': _unpack_stack(P, cols),
+            'population': population,
+            'extinction': extinction,
+            'period': period,
+            'settled': settled}
@@ -10,20 +10,45 @@ Original file is located at
 import numpy as np
 
 def life_step_1(X):
-    """Game of life step using generator expressions"""
+    """Game of life step using generator expressions
+
+    The board wraps around at the edges (a torus), so the top row is next to
+    the bottom row and the left column next to the right one.  The other
+    kernels in this folder (bitlife, sparselife, parlife, ensemble, rules)
+    step the board in exactly the same way.
+    """
     nbrs_count = sum(np.roll(np.roll(X, i, 0), j, 1)
                      for i in (-1, 0, 1) for j in (-1, 0, 1)
                      if (i != 0 or j != 0))
     return (nbrs_count == 3) | (X & (nbrs_count == 2))
 
 def life_step_2(X):
-    """Game of life step using scipy tools"""
+    """Game of life step using scipy tools, wrapping around like life_step_1"""
     from scipy.signal import convolve2d
     nbrs_count = convolve2d(X, np.ones((3, 3)), mode='same', boundary='wrap') - X
     return (nbrs_count == 3) | (X & (nbrs_count == 2))
-    
+
 life_step = life_step_1
 
+# Bit-packed kernel (64 cells per uint64 word), much faster on large boards
+#from bitlife import life_step_bitpacked
+#life_step = life_step_bitpacked
+
+# HashLife engine, jumps far ahead in one call, e.g. hashlife_advance(X, 10**6)
+#from hashlife import hashlife_advance, hashlife_jump
+
+# Sparse stepping, only recomputes tiles near last generation's changes
+#from sparselife import make_life_step_sparse
+#life_step = make_life_step_sparse(tile=16)
+
+# Multi-core stepping in row bands, for very large boards
+#from parlife import make_life_step_parallel
+#life_step = make_life_step_parallel()
+
+# Any Life-like rule in B/S notation, e.g. HighLife is B36/S23
+#from rules import make_life_step
+#life_step = make_life_step('B36/S23')
+
 # Commented out IPython magic to ensure Python compatibility.
 # %pylab inline
 
@@ -36,7 +61,12 @@ from matplotlib import animation
 from matplotlib.animation import FuncAnimation
 from IPython.display import HTML
 
-def life_animation(X, dpi=10, frames=10, interval=300, mode='loop'):
+# Spots when the board dies out or settles into a still life or oscillator
+from bitlife import pack_board
+from cycles import CycleDetector
+
+def life_animation(X, dpi=10, frames=10, interval=300, mode='loop',
+                   stop_when_stable=False):
     """Produce a Game of Life Animation
     
     Parameters
@@ -52,6 +82,9 @@ def life_animation(X, dpi=10, frames=10, interval=300, mode='loop'):
         The time interval (in milliseconds) between frames
     mode : string
         The default mode of the animation.  Options are ['loop'|'once'|'reflect']
+    stop_when_stable : bool
+        End the animation once the board has died out or settled into a
+        still life or oscillator, instead of always running all frames
     """
     X = np.asarray(X)
     assert X.ndim == 2
@@ -78,39 +111,62 @@ def life_animation(X, dpi=10, frames=10, interval=300, mode='loop'):
         return (im,)
     animate.X = X
 
+    # Frame numbers until the board starts repeating (or frames run out)
+    def frame_numbers():
+        detector = CycleDetector()
+        for i in range(frames):
+            if stop_when_stable and detector.update(pack_board(animate.X)):
+                return
+            yield i
+
     anim = animation.FuncAnimation(fig, animate, init_func=init,
-                                   frames=frames, interval=interval)
+                                   frames=frame_numbers, save_count=frames,
+                                   interval=interval)
     
     #print anim_to_html(anim)
     #return display_animation(anim, default_mode=mode)
     anim.save('basic_animation.mp4', fps=10, extra_args=['-vcodec', 'libx264'])
     return HTML(anim.to_html5_video())
 
-# http://jakevdp.github.io/blog/2013/08/07/conways-game-of-life/
-np.random.seed(0)
-#X = np.zeros((30, 40), dtype=bool)
-X = np.zeros((100, 100))
-#X[1:4, 1:4] = [[0, 0, 1],
-#               [1, 0, 1],
-#               [0, 1, 1]]
-#X[48:51, 48:51] = [[0, 1, 1],
-#                   [1, 1, 0],
-#                   [0, 1, 0]]
-X[48:51, 48:55] = [[0, 1, 0, 0, 0, 0, 0],
-                   [0, 0, 0, 1, 0, 0, 0],
-                   [1, 1, 0, 0, 1, 1, 1]]
-#X = [[0, 0, 0, 0, 0],
-#     [0, 0, 1, 0, 0],
-#     [0, 0, 1, 0, 0],
-#     [0, 0, 1, 0, 0],
-#     [0, 0, 0, 0, 0]]
-X = np.array(X)
-#X.shape
-#r = np.random.random((10, 20))
-#X[10:20, 10:30] = (r > 0.75)
-life_animation(X, dpi=50, frames=1000, mode='once', interval=20)
-
-plt.show()
+# Only run the demo when executed as a script, so the kernels can be imported
+if __name__ == '__main__':
+    # http://jakevdp.github.io/blog/2013/08/07/conways-game-of-life/
+    np.random.seed(0)
+    #X = np.zeros((30, 40), dtype=bool)
+    X = np.zeros((100, 100))
+    #X[1:4, 1:4] = [[0, 0, 1],
+    #               [1, 0, 1],
+    #               [0, 1, 1]]
+    #X[48:51, 48:51] = [[0, 1, 1],
+    #                   [1, 1, 0],
+    #                   [0, 1, 0]]
+    X[48:51, 48:55] = [[0, 1, 0, 0, 0, 0, 0],
+                       [0, 0, 0, 1, 0, 0, 0],
+                       [1, 1, 0, 0, 1, 1, 1]]
+    #X = [[0, 0, 0, 0, 0],
+    #     [0, 0, 1, 0, 0],
+    #     [0, 0, 1, 0, 0],
+    #     [0, 0, 1, 0, 0],
+    #     [0, 0, 0, 0, 0]]
+    X = np.array(X)
+    #X.shape
+    #r = np.random.random((10, 20))
+    #X[10:20, 10:30] = (r > 0.75)
+
+    # Statistics over many random densities at once, without rendering
+    #from ensemble import life_ensemble, random_ensemble
+    #stats = life_ensemble(random_ensemble(1000, (100, 100), np.linspace(0.05, 0.95, 1000)), 1000)
+
+    # Keep every generation on disk, read back with TrajectoryReader('trajectory.life')[k]
+    #from recorder import life_record, TrajectoryReader
+    #life_record(X, 100000, 'trajectory.life')
+
+    life_animation(X, dpi=50, frames=1000, mode='once', interval=20)
+    # Headless renderer, writes the video without going through matplotlib
+    #from render import life_render
+    #life_render(X, life_step, frames=1000, scale=8, fps=10)
+
+    plt.show()
 
 #!pip uninstall JSAnimation
 #!pip uninstall matplotlib -y
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""HashLife engine for long Game of Life runs
+
+HashLife stores the board as a quadtree in which identical sub-squares are
+shared, and memoizes the future of every sub-square.  Repetitive or sparse
+patterns can then be jumped forward 2^k generations in a single call.
+
+Two kinds of universe are supported:
+
+* wrap=False (default): the board is a window onto an infinite plane.  Cells
+  that leave the window keep being simulated, but only the window is
+  returned.  Any board shape is accepted.
+* wrap=True: the board is a torus, the same as for the life_step kernels.
+  The board has to be square with a power-of-two side.
+
+See https://en.wikipedia.org/wiki/Hashlife
+"""
+
+import numpy as np
+
+class _Node:
+    """Quadtree node of level k covering a 2^k x 2^k square with n live cells"""
+
+    __slots__ = ('k', 'nw', 'ne', 'sw', 'se', 'n')
+
+    def __init__(self, k, nw, ne, sw, se, n):
+        self.k = k
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.n = n
+
+OFF = _Node(0, None, None, None, None, 0)
+ON = _Node(0, None, None, None, None, 1)
+
+# Nodes are hash-consed, so two nodes are equal exactly when they are the
+# same object and the default identity hash can be used as a dict key
+_join_cache = {}
+_successor_cache = {}
+_empty_cache = [OFF]
+
+def hashlife_clear_cache():
+    """Forget all memoized nodes and results to free memory"""
+    _join_cache.clear()
+    _successor_cache.clear()
+    del _empty_cache[1:]
+
+def _join(nw, ne, sw, se):
+    """Combine four level k nodes into the unique level k+1 node"""
+    key = (nw, ne, sw, se)
+    node = _join_cache.get(key)
+    if node is None:
+        node = _Node(nw.k + 1, nw, ne, sw, se, nw.n + ne.n + sw.n + se.n)
+        _join_cache[key] = node
+    return node
+
+def _empty(k):
+    """Empty node of level k"""
+    while len(_empty_cache) <= k:
+        e = _empty_cache[-1]
+        _empty_cache.append(_join(e, e, e, e))
+    return _empty_cache[k]
+
+def _centre(m):
+    """Level k+1 node with m in the middle and empty space around it"""
+    e = _empty(m.k - 1)
+    return _join(_join(e, e, e, m.nw), _join(e, e, m.ne, e),
+                 _join(e, m.sw, e, e), _join(m.se, e, e, e))
+
+def _inner(m):
+    """Level k-1 node at the middle of m"""
+    return _join(m.nw.se, m.ne.sw, m.sw.ne, m.se.nw)
+
+def _life_4x4(m):
+    """Centre 2x2 of a level 2 node after one generation"""
+    g = [[m.nw.nw.n, m.nw.ne.n, m.ne.nw.n, m.ne.ne.n],
+         [m.nw.sw.n, m.nw.se.n, m.ne.sw.n, m.ne.se.n],
+         [m.sw.nw.n, m.sw.ne.n, m.se.nw.n, m.se.ne.n],
+         [m.sw.sw.n, m.sw.se.n, m.se.sw.n, m.se.se.n]]
+
+    def cell(r, c):
+        nbrs_count = sum(g[r + i][c + j] for i in (-1, 0, 1) for j in (-1, 0, 1)
+                         if (i != 0 or j != 0))
+        alive = nbrs_count == 3 or (g[r][c] and nbrs_count == 2)
+        return ON if alive else OFF
+
+    return _join(cell(1, 1), cell(1, 2), cell(2, 1), cell(2, 2))
+
+def _successor(m, j):
+    """Level k-1 centre of a level k node after 2^j generations (j <= k-2)"""
+    key = (m, j)
+    result = _successor_cache.get(key)
+    if result is not None:
+        return result
+
+    if m.n == 0:
+        result = m.nw
+    elif m.k == 2:
+        result = _life_4x4(m)
+    else:
+        # Nine overlapping level k-1 sub-squares, each advanced by up to
+        # 2^(k-3) generations, give the centre at half time ...
+        c1 = _successor(m.nw, j)
+        c2 = _successor(_join(m.nw.ne, m.ne.nw, m.nw.se, m.ne.sw), j)
+        c3 = _successor(m.ne, j)
+        c4 = _successor(_join(m.nw.sw, m.nw.se, m.sw.nw, m.sw.ne), j)
+        c5 = _successor(_inner(m), j)
+        c6 = _successor(_join(m.ne.sw, m.ne.se, m.se.nw, m.se.ne), j)
+        c7 = _successor(m.sw, j)
+        c8 = _successor(_join(m.sw.ne, m.se.nw, m.sw.se, m.se.sw), j)
+        c9 = _successor(m.se, j)
+        if j < m.k - 2:
+            # ... which is already all the generations we were asked for
+            result = _join(_join(c1.se, c2.sw, c4.ne, c5.nw),
+                           _join(c2.se, c3.sw, c5.ne, c6.nw),
+                           _join(c4.se, c5.sw, c7.ne, c8.nw),
+                           _join(c5.se, c6.sw, c8.ne, c9.nw))
+        else:
+            # ... and a second round gives the full 2^(k-2) generations
+            result = _join(_successor(_join(c1, c2, c4, c5), j),
+                           _successor(_join(c2, c3, c5, c6), j),
+                           _successor(_join(c4, c5, c7, c8), j),
+                           _successor(_join(c5, c6, c8, c9), j))
+
+    _successor_cache[key] = result
+    return result
+
+def _from_array(X, r, c, k):
+    """Node of level k for the square of X with top-left corner (r, c)"""
+    size = 1 << k
+    if not X[r:r + size, c:c + size].any():
+        return _empty(k)
+    if k == 0:
+        return ON
+    half = size >> 1
+    return _join(_from_array(X, r, c, k - 1), _from_array(X, r, c + half, k - 1),
+                 _from_array(X, r + half, c, k - 1), _from_array(X, r + half, c + half, k - 1))
+
+def _to_array(m, out, r, c):
+    """Write node m into out with its top-left corner at (r, c), clipping"""
+    size = 1 << m.k
+    if (m.n == 0 or r >= out.shape[0] or c >= out.shape[1]
+            or r + size <= 0 or c + size <= 0):
+        return
+    if m.k == 0:
+        out[r, c] = True
+        return
+    half = size >> 1
+    _to_array(m.nw, out, r, c)
+    _to_array(m.ne, out, r, c + half)
+    _to_array(m.sw, out, r + half, c)
+    _to_array(m.se, out, r + half, c + half)
+
+def _board_level(X):
+    """Smallest level (at least 2) whose square holds the whole board"""
+    k = 2
+    while (1 << k) < max(X.shape):
+        k += 1
+    return k
+
+def _advance_plane(X, generations):
+    """Advance a window onto the infinite plane"""
+    k = _board_level(X)
+    padded = np.zeros((1 << k, 1 << k), dtype=bool)
+    padded[:X.shape[0], :X.shape[1]] = X
+    node = _from_array(padded, 0, 0, k)
+    # Plane coordinates of the top-left corner of node
+    top = left = 0
+
+    j = 0
+    while generations:
+        if generations & 1:
+            # Grow until the pattern sits in the inner half of node with at
+            # least 2^j cells of room, so nothing can escape the centre of
+            # _centre(node) during the jump
+            while node.k < j + 2 or _inner(node).n != node.n:
+                half = 1 << (node.k - 1)
+                node = _centre(node)
+                top -= half
+                left -= half
+            node = _successor(_centre(node), j)
+        generations >>= 1
+        j += 1
+
+    out = np.zeros(X.shape, dtype=bool)
+    _to_array(node, out, top, left)
+    return out
+
+def _advance_torus(X, generations):
+    """Advance a square power-of-two board that wraps around at the edges"""
+    size = X.shape[0]
+    if X.shape[0] != X.shape[1] or size < 4 or size & (size - 1):
+        raise ValueError("wrap=True needs a square board with a power-of-two side "
+                         "of at least 4, got shape %s" % (X.shape,))
+    node = _from_array(X, 0, 0, _board_level(X))
+
+    # Tiling the plane with copies of the board rolled by half a board puts an
+    # unrolled copy in the centre of the 2x2 tiling.  The centre of that
+    # level k+1 node can then be jumped up to 2^(k-1) generations ahead.
+    max_j = node.k - 1
+    j = 0
+    while generations:
+        if generations & 1:
+            jumps, step = (1, j) if j <= max_j else (1 << (j - max_j), max_j)
+            for _ in range(jumps):
+                rolled = _join(node.se, node.sw, node.ne, node.nw)
+                node = _successor(_join(rolled, rolled, rolled, rolled), step)
+        generations >>= 1
+        j += 1
+
+    out = np.zeros(X.shape, dtype=bool)
+    _to_array(node, out, 0, 0)
+    return out
+
+def hashlife_advance(X, generations, wrap=False):
+    """Advance a Game of Life board by any number of generations with HashLife
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional array showing the game board
+    generations : integer
+        the number of generations to advance
+    wrap : bool
+        if True the board wraps around at the edges like life_step_1, which
+        needs a square board with a power-of-two side.  Otherwise the board is
+        a window onto an infinite plane.
+
+    Returns
+    -------
+    X : ndarray of bool
+        the board after the given number of generations, same shape as X
+    """
+    X = np.asarray(X).astype(bool)
+    assert X.ndim == 2
+    if generations < 0:
+        raise ValueError("generations must be non-negative, got %d" % generations)
+    if wrap:
+        return _advance_torus(X, generations)
+    return _advance_plane(X, generations)
+
+def hashlife_jump(X, k, wrap=False):
+    """Advance a Game of Life board by 2^k generations in one call"""
+    return hashlife_advance(X, 1 << k, wrap)
+
+def life_step_hashlife(X):
+    """Game of life step using HashLife (on the infinite plane)"""
+    return hashlife_advance(X, 1)
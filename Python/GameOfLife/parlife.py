@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Multi-core Game of Life stepping for very large boards
+
+The packed board (see bitlife.py) is split into bands of rows.  Every
+generation each band is advanced by a worker thread, reading the one row
+halo above and below it from the shared current board and writing into a
+shared next board, after which the two boards are swapped.  NumPy releases
+the GIL inside the word-wide bitwise operations, so the bands really do run
+on separate cores without copying the board between processes.
+"""
+
+import os
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bitlife import pack_board, unpack_board, packed_life_rows
+
+class ParallelLife:
+    """Game of Life board stepped in row bands by a pool of threads
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional array showing the game board
+    workers : integer
+        the number of threads, the number of cores by default
+    bands : integer
+        the number of row bands, the number of workers by default
+    executor : ThreadPoolExecutor
+        an existing pool to run on, which close() then leaves running
+    """
+
+    def __init__(self, X, workers=None, bands=None, executor=None):
+        X = np.asarray(X)
+        assert X.ndim == 2
+        self.rows, self.cols = X.shape
+        self.workers = workers or os.cpu_count() or 1
+        bands = min(bands or self.workers, self.rows)
+        self.bounds = np.linspace(0, self.rows, bands + 1).astype(int)
+        # Double buffer, both shared by all the workers
+        self.current = pack_board(X)
+        self.next = np.empty_like(self.current)
+        self.own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=self.workers)
+        self.generation = 0
+
+    def load(self, X):
+        """Start again from board X, which must have the same shape"""
+        X = np.asarray(X)
+        assert X.shape == (self.rows, self.cols)
+        self.current[...] = pack_board(X)
+
+    @property
+    def board(self):
+        """The current board as a bool array"""
+        return unpack_board(self.current, self.cols)
+
+    def _step_band(self, r0, r1):
+        cur = self.current
+        # Halo rows from the neighbouring bands, wrapping at the edges
+        halo_top = cur[(r0 - 1) % self.rows][None, :]
+        halo_bottom = cur[r1 % self.rows][None, :]
+        up = np.concatenate((halo_top, cur[r0:r1 - 1]))
+        down = np.concatenate((cur[r0 + 1:r1], halo_bottom))
+        self.next[r0:r1] = packed_life_rows(up, cur[r0:r1], down, self.cols)
+
+    def step(self):
+        """Advance the board by one generation"""
+        futures = [self.executor.submit(self._step_band, r0, r1)
+                   for r0, r1 in zip(self.bounds[:-1], self.bounds[1:])]
+        # Every band has to finish before the buffers can be swapped
+        for f in futures:
+            f.result()
+        self.current, self.next = self.next, self.current
+        self.generation += 1
+
+    def run(self, generations):
+        """Advance the board by several generations and return it"""
+        for _ in range(generations):
+            self.step()
+        return self.board
+
+    def close(self):
+        """Shut down the worker threads"""
+        if self.own_executor:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def life_run_parallel(X, generations, workers=None):
+    """Run the game of life for several generations on all cores"""
+    with ParallelLife(X, workers) as life:
+        return life.run(generations)
+
+def make_life_step_parallel(workers=None):
+    """Make a life_step function that steps boards on a shared thread pool
+
+    The function keeps one ParallelLife between calls and only packs the
+    board again when it is handed something other than its last result, so
+    X = life_step(X) in a loop only pays for the step and the unpacking.
+    Without the unpacking ParallelLife.run is faster still.
+    """
+    workers = workers or os.cpu_count() or 1
+    executor = ThreadPoolExecutor(max_workers=workers)
+    atexit.register(executor.shutdown)
+
+    def life_step_parallel(X):
+        X = np.asarray(X)
+        life = life_step_parallel.life
+        if (life is None or life.rows != X.shape[0] or life.cols != X.shape[1]):
+            life = life_step_parallel.life = ParallelLife(X, workers, executor=executor)
+        elif not np.array_equal(X, life_step_parallel.last):
+            life.load(X)
+        life.step()
+        life_step_parallel.last = life.board
+        # A copy, so changing the returned board can't change the next step
+        return life_step_parallel.last.copy()
+    life_step_parallel.life = None
+    life_step_parallel.last = None
+
+    return life_step_parallel
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""Memory-mapped recording of every generation of a Game of Life run
+
+Boards are stored bit-packed (see bitlife.py) one after the other behind a
+small header, so any generation can be read back straight from the file
+without loading the rest.  Both the recorder and the reader go through
+np.memmap, so RAM use stays constant however long the run is.
+
+File layout: a 64 byte header (HEADER below), then `count` frames of
+rows x words little-endian uint64 words.  Frame i holds generation
+start + i * stride.
+"""
+
+import numpy as np
+
+from bitlife import pack_board, unpack_board, packed_life_step
+
+MAGIC = b'LIFETRAJ'
+VERSION = 1
+
+HEADER = np.dtype([('magic', 'S8'), ('version', '<u4'), ('reserved', '<u4'),
+                   ('rows', '<u8'), ('cols', '<u8'), ('words', '<u8'),
+                   ('count', '<u8'), ('start', '<u8'), ('stride', '<u8')])
+
+class TrajectoryRecorder:
+    """Append packed boards to a memory-mapped trajectory file
+
+    Parameters
+    ----------
+    path : string
+        the file to write, replaced if it exists
+    shape : tuple
+        the (rows, cols) of the board
+    start : integer
+        the generation of the first recorded board
+    stride : integer
+        the number of generations between recorded boards
+    chunk : integer
+        the file grows by room for this many boards at a time
+    """
+
+    def __init__(self, path, shape, start=0, stride=1, chunk=256):
+        self.path = path
+        self.rows, self.cols = shape
+        self.words = -(-self.cols // 64)
+        self.chunk = chunk
+        self.count = 0
+        self.capacity = 0
+        self.frames = None
+
+        with open(path, 'wb') as f:
+            header = np.zeros(1, dtype=HEADER)
+            header['magic'] = MAGIC
+            header['version'] = VERSION
+            header['rows'], header['cols'], header['words'] = self.rows, self.cols, self.words
+            header['start'], header['stride'] = start, stride
+            f.write(header.tobytes())
+        self.header = np.memmap(path, dtype=HEADER, mode='r+', shape=(1,))
+        self._grow()
+
+    def _grow(self):
+        """Make room for another chunk of boards and map the larger file"""
+        if self.frames is not None:
+            self.frames.flush()
+            del self.frames
+        self.capacity += self.chunk
+        frame_bytes = self.rows * self.words * 8
+        with open(self.path, 'r+b') as f:
+            f.truncate(HEADER.itemsize + self.capacity * frame_bytes)
+        self.frames = np.memmap(self.path, dtype='<u8', mode='r+', offset=HEADER.itemsize,
+                                shape=(self.capacity, self.rows, self.words))
+
+    def append_packed(self, P):
+        """Record a packed board, as returned by pack_board"""
+        if self.count == self.capacity:
+            self._grow()
+        self.frames[self.count] = P
+        self.count += 1
+        # Keep the header current so a crashed run is still readable
+        self.header['count'] = self.count
+
+    def append(self, X):
+        """Record a two-dimensional bool board"""
+        self.append_packed(pack_board(X))
+
+    def close(self):
+        """Flush everything and trim the unused room off the end of the file"""
+        if self.frames is None:
+            return
+        self.frames.flush()
+        self.header.flush()
+        del self.frames, self.header
+        self.frames = None
+        with open(self.path, 'r+b') as f:
+            f.truncate(HEADER.itemsize + self.count * self.rows * self.words * 8)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TrajectoryReader:
+    """Random access to the boards of a trajectory file
+
+    Indexing with i gives the i-th recorded board as a bool array, which is
+    generation start + i * stride.
+    """
+
+    def __init__(self, path):
+        header = np.fromfile(path, dtype=HEADER, count=1)
+        if len(header) != 1 or header['magic'][0] != MAGIC:
+            raise ValueError("%s is not a Game of Life trajectory file" % path)
+        if header['version'][0] != VERSION:
+            raise ValueError("unsupported trajectory file version %d" % header['version'][0])
+        self.rows = int(header['rows'][0])
+        self.cols = int(header['cols'][0])
+        self.words = int(header['words'][0])
+        self.start = int(header['start'][0])
+        self.stride = int(header['stride'][0])
+        self.count = int(header['count'][0])
+        if self.count:
+            self.frames = np.memmap(path, dtype='<u8', mode='r', offset=HEADER.itemsize,
+                                    shape=(self.count, self.rows, self.words))
+        else:
+            self.frames = np.zeros((0, self.rows, self.words), dtype='<u8')
+
+    def __len__(self):
+        return self.count
+
+    def packed(self, i):
+        """The i-th recorded board, still packed"""
+        return self.frames[i]
+
+    def __getitem__(self, i):
+        return unpack_board(self.frames[i], self.cols)
+
+    def generation(self, k):
+        """The board at generation k of the run"""
+        i, offset = divmod(k - self.start, self.stride)
+        if offset != 0 or not 0 <= i < self.count:
+            raise IndexError("generation %d was not recorded" % k)
+        return self[i]
+
+def life_record(X, generations, path, stride=1):
+    """Run the game of life and record every stride-th generation to path
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional array showing the game board
+    generations : integer
+        the number of generations to run
+    path : string
+        the trajectory file to write
+    stride : integer
+        the number of generations between recorded boards
+
+    Returns
+    -------
+    X : ndarray of bool
+        the board after the last generation
+    """
+    X = np.asarray(X)
+    assert X.ndim == 2
+    cols = X.shape[1]
+    P = pack_board(X)
+    with TrajectoryRecorder(path, X.shape, 0, stride) as recorder:
+        recorder.append_packed(P)
+        for g in range(1, generations + 1):
+            P = packed_life_step(P, cols)
+            if g % stride == 0:
+                recorder.append_packed(P)
+    return unpack_board(P, cols)
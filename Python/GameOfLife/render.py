@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Headless rendering of Game of Life runs straight to video
+
+Board states are turned into uint8 RGB frames with a palette lookup and
+integer upscaling, and a background thread pipes the raw frames into ffmpeg
+while the simulation computes the next generation.  Nothing goes through
+matplotlib, and the video is encoded only once.
+"""
+
+import subprocess
+import threading
+import queue
+
+import numpy as np
+
+from bitlife import pack_board
+from cycles import CycleDetector
+
+# Same look as life_animation: the binary colormap with clim (-0.05, 1)
+LIFE_PALETTE = np.array([[243, 243, 243],   # dead
+                         [0, 0, 0]],        # alive
+                        dtype=np.uint8)
+
+def board_to_frame(X, palette=LIFE_PALETTE, scale=1):
+    """Map a board of small integer states to an RGB uint8 frame
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional array of states, used as indices into palette
+    palette : ndarray of uint8, shape (states, 3)
+        the RGB color of each state
+    scale : integer
+        each cell becomes a scale x scale block of pixels
+
+    Returns
+    -------
+    frame : ndarray of uint8, shape (rows * scale, cols * scale, 3)
+    """
+    frame = palette[np.asarray(X).astype(np.intp)]
+    if scale > 1:
+        frame = np.repeat(np.repeat(frame, scale, axis=0), scale, axis=1)
+    return frame
+
+class FrameEncoder:
+    """Encode RGB frames to a video file with ffmpeg in a background thread
+
+    Parameters
+    ----------
+    filename : string
+        the video file to write
+    width, height : integer
+        the size of every frame in pixels
+    fps : integer
+        frames per second of the video
+    codec : string
+        the ffmpeg video codec
+    queue_size : integer
+        the number of frames that can wait for the encoder before write blocks
+    ffmpeg : string
+        the ffmpeg executable
+    """
+
+    def __init__(self, filename, width, height, fps=10, codec='libx264',
+                 queue_size=64, ffmpeg='ffmpeg'):
+        self.width = width
+        self.height = height
+        # yuv420p (playable everywhere) needs even dimensions, pad if needed
+        self.pad = (height % 2, width % 2)
+        self.proc = subprocess.Popen(
+            [ffmpeg, '-y', '-loglevel', 'error',
+             '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+             '-s', '%dx%d' % (width + self.pad[1], height + self.pad[0]),
+             '-r', str(fps), '-i', '-',
+             '-vcodec', codec, '-pix_fmt', 'yuv420p', filename],
+            stdin=subprocess.PIPE)
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._encode, daemon=True)
+        self.thread.start()
+
+    def _encode(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue  # keep draining so write never blocks forever
+            try:
+                self.proc.stdin.write(frame)
+            except OSError as e:
+                self.error = e
+
+    def write(self, frame):
+        """Queue one (height, width, 3) uint8 frame for encoding"""
+        if self.error is not None:
+            raise self.error
+        assert frame.shape == (self.height, self.width, 3)
+        if self.pad != (0, 0):
+            frame = np.pad(frame, ((0, self.pad[0]), (0, self.pad[1]), (0, 0)), mode='edge')
+        self.frames.put(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+
+    def close(self, check=True):
+        """Wait for every queued frame to be encoded and finish the file
+
+        With check, a write error or ffmpeg failure is raised here.
+        """
+        self.frames.put(None)
+        self.thread.join()
+        self.proc.stdin.close()
+        returncode = self.proc.wait()
+        if not check:
+            return
+        if self.error is not None:
+            raise self.error
+        if returncode != 0:
+            raise RuntimeError("ffmpeg exited with status %d" % returncode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # An error in the with body matters more than what it did to ffmpeg
+        self.close(check=exc_type is None)
+
+def life_render(X, life_step, frames=10, scale=10, fps=10,
+                filename='basic_animation.mp4', palette=LIFE_PALETTE,
+                stop_when_stable=False):
+    """Render a Game of Life run to a video file without matplotlib
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional numpy array showing the game board
+    life_step : function
+        the step kernel, e.g. life_step_1
+    frames : integer
+        The number of frames to compute for the video
+    scale : integer
+        each cell becomes a scale x scale block of pixels
+    fps : integer
+        frames per second of the video
+    filename : string
+        the video file to write
+    palette : ndarray of uint8
+        the RGB colors of dead and alive cells
+    stop_when_stable : bool
+        end the video once the board has died out or settled into a still
+        life or oscillator, after one full period of it
+
+    Returns
+    -------
+    X : ndarray of bool
+        the board after the last frame
+    """
+    X = np.asarray(X)
+    assert X.ndim == 2
+    X = X.astype(bool)
+
+    detector = CycleDetector()
+    with FrameEncoder(filename, X.shape[1] * scale, X.shape[0] * scale, fps) as encoder:
+        for i in range(frames):
+            encoder.write(board_to_frame(X, palette, scale))
+            if stop_when_stable and detector.update(pack_board(X)):
+                break
+            X = life_step(X)
+    return X
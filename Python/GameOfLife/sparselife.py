@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Sparse active-region stepping for mostly-empty Game of Life boards
+
+The board is cut into square tiles.  A cell can only change if something in
+its neighbourhood changed in the previous generation, so each step only
+recomputes the tiles that changed last time plus the tiles around them.
+When too much of the board is active the dense kernel is used instead.
+"""
+
+import numpy as np
+
+from bitlife import life_step_bitpacked
+
+class SparseLife:
+    """Game of Life board that only recomputes tiles near recent changes
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional array showing the game board
+    tile : integer
+        the side of the square tiles the board is cut into
+    dense_threshold : float
+        fraction of tiles above which a step uses the dense kernel
+    """
+
+    def __init__(self, X, tile=16, dense_threshold=0.5):
+        X = np.array(X, dtype=bool)
+        assert X.ndim == 2
+        self.board = X
+        self.tile = tile
+        self.dense_threshold = dense_threshold
+        self.tile_rows = -(-X.shape[0] // tile)
+        self.tile_cols = -(-X.shape[1] // tile)
+        # Tiles that changed in the previous generation, everything at first
+        self.changed = np.ones((self.tile_rows, self.tile_cols), dtype=bool)
+        self.generation = 0
+        self.dense_steps = 0
+
+    def active_tiles(self):
+        """Tiles that changed last generation plus their neighbours (wrapping)"""
+        active = self.changed.copy()
+        for i in (-1, 0, 1):
+            for j in (-1, 0, 1):
+                if i != 0 or j != 0:
+                    active |= np.roll(np.roll(self.changed, i, 0), j, 1)
+        return active
+
+    def step(self):
+        """Advance the board by one generation, in place"""
+        active = self.active_tiles()
+        count = np.count_nonzero(active)
+        if count > self.dense_threshold * active.size:
+            self._step_dense()
+        elif count > 0:
+            self._step_tiles(*np.nonzero(active))
+        self.generation += 1
+        return self.board
+
+    def run(self, generations):
+        """Advance the board by several generations"""
+        for _ in range(generations):
+            self.step()
+        return self.board
+
+    def _step_dense(self):
+        X = self.board
+        new = life_step_bitpacked(X)
+        diff = new != X
+        # Reduce the cell changes to tile changes, padding partial tiles
+        padded = np.zeros((self.tile_rows * self.tile, self.tile_cols * self.tile), dtype=bool)
+        padded[:X.shape[0], :X.shape[1]] = diff
+        self.changed = padded.reshape(self.tile_rows, self.tile,
+                                      self.tile_cols, self.tile).any(axis=(1, 3))
+        self.board = new
+        self.dense_steps += 1
+
+    def _step_tiles(self, ti, tj):
+        X = self.board
+        rows, cols = X.shape
+        t = self.tile
+
+        # Gather every active tile with a one cell halo into a (n, t+2, t+2)
+        # stack.  Indices wrap around the board; rows and columns past the
+        # edge of a partial tile are computed but never written back.
+        halo = np.arange(-1, t + 1)
+        R = (ti[:, None] * t + halo) % rows
+        C = (tj[:, None] * t + halo) % cols
+        block = X[R[:, :, None], C[:, None, :]]
+
+        nbrs_count = sum(block[:, 1 + i:t + 1 + i, 1 + j:t + 1 + j].astype(np.uint8)
+                         for i in (-1, 0, 1) for j in (-1, 0, 1)
+                         if (i != 0 or j != 0))
+        old = block[:, 1:-1, 1:-1]
+        new = (nbrs_count == 3) | (old & (nbrs_count == 2))
+
+        # The old values are all in block already, so the board can be
+        # updated in place
+        R = np.broadcast_to((ti * t)[:, None, None] + np.arange(t)[None, :, None], new.shape)
+        C = np.broadcast_to((tj * t)[:, None, None] + np.arange(t)[None, None, :], new.shape)
+        valid = (R < rows) & (C < cols)
+        X[R[valid], C[valid]] = new[valid]
+
+        self.changed = np.zeros_like(self.changed)
+        self.changed[ti, tj] = ((new != old) & valid).any(axis=(1, 2))
+
+def make_life_step_sparse(tile=16, dense_threshold=0.5):
+    """Make a life_step function that steps sparsely between calls
+
+    The returned function keeps the tile activity of the last board it
+    returned, and updates that board in place when it is passed back in.
+    Any other board starts a fresh sparse run.
+    """
+    state = {'life': None}
+
+    def life_step_sparse(X):
+        life = state['life']
+        if life is None or X is not life.board:
+            life = state['life'] = SparseLife(X, tile, dense_threshold)
+        return life.step()
+
+    return life_step_sparse
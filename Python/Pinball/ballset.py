@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Structure-of-arrays storage for the moving pinball balls
+
+Every moving ball keeps its position, velocity and radius in one slot of
+a few contiguous NumPy arrays, so draining,
+moving, friction, gravity, the region effects and the MAX_SPEED clamp are
+done for all balls at once instead of ball by ball with tiny arrays.
+
+A PinballCircle added to a BallSet reads and writes its center and speed
+straight from its slot, so the collision code works the same either way.
+Its mass and bumper multiplier stay on the ball, where the collision
+response and the actuators read and change them.
+"""
+
+import numpy as np
+
+class BallSet:
+    """Positions, velocities and radii of all moving balls
+
+    Parameters
+    ----------
+    capacity : integer
+        room for this many balls before the arrays have to grow
+    """
+
+    def __init__(self, capacity=16):
+        self.n = 0
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.radius = np.zeros(capacity)
+        self.balls = []   # the PinballCircle in each slot
+
+    def __len__(self):
+        return self.n
+
+    def _grow(self):
+        capacity = 2 * len(self.pos)
+        for name in ('pos', 'vel', 'radius'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:])
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def add(self, ball):
+        """Move the state of ball into the next free slot"""
+        if self.n == len(self.pos):
+            self._grow()
+        i = self.n
+        self.pos[i] = ball.center
+        self.vel[i] = ball.speed
+        self.radius[i] = ball.radius
+        self.balls.append(ball)
+        self.n += 1
+        ball.attach(self, i)
+
+    def remove(self, ball):
+        """Give ball its own state back and fill its slot with the last ball"""
+        i, last = ball.slot, self.n - 1
+        ball.detach(self.pos[i].copy(), self.vel[i].copy())
+        if i != last:
+            for a in (self.pos, self.vel, self.radius):
+                a[i] = a[last]
+            self.balls[i] = self.balls[last]
+            self.balls[i].slot = i
+        self.balls.pop()
+        self.n -= 1
+
+    def step(self, regions, friction, gravity, max_speed, dt=1.0, segments=None):
+        """Drain, move and accelerate every ball by dt ticks
+
+        Parameters
+        ----------
+        regions : list of PinballRegion
+            where a ball is drained, or feels another friction or gravity.
+            The first region a ball is in wins.
+        friction, gravity, max_speed : float
+            the friction, gravity and speed limit outside of any region,
+            friction and gravity are per tick
+        dt : float
+            the length of the step in ticks, less than 1 for substeps
+        segments : Segments
+            if given, balls stop where they first touch a line instead of
+            moving through it
+
+        Returns
+        -------
+        drained : list of PinballCircle
+            the balls that were drained, already removed from the set
+        """
+        # Draining looks at where the balls were before moving
+        drained = np.zeros(self.n, dtype=bool)
+        for region in regions:
+            if region.disappears:
+                drained |= region.contains(self.pos[:self.n])
+        gone = [self.balls[i] for i in np.flatnonzero(drained)]
+        for ball in gone:
+            self.remove(ball)
+
+        n = self.n
+        pos, vel = self.pos[:n], self.vel[:n]
+        move = vel * (dt / 2.0)
+        if segments is not None:
+            move *= segments.time_of_impact(pos, move, self.radius[:n])[:, None]
+        pos += move
+
+        f = np.full(n, friction)
+        g = np.full(n, gravity)
+        for region in reversed(regions):
+            if region.friction is not None or region.gravity is not None:
+                inside = region.contains(pos)
+                if region.friction is not None:
+                    f[inside] = region.friction
+                if region.gravity is not None:
+                    g[inside] = region.gravity
+        vel *= (f ** (dt / 2.0))[:, None]
+        vel[:, 1] += g / 2.0 * dt
+        np.clip(vel, -max_speed, max_speed, out=vel)
+        return gone
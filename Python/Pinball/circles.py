@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Vectorized narrow-phase collision test of circles against each other
+
+The circle half of PinballCircle.is_collision for every ball and fixed
+circle at once: the SpatialHash gives the pairs of circles that share a grid
+cell, and two circles touch when the distance between their centers is at
+most the sum of their radii.  Like is_collision, each circle's hit is the
+touching circle with the lowest id.
+"""
+
+import numpy as np
+
+# With fewer pairs of circles than this, testing them all is faster than the grid
+GRID_MIN_PAIRS = 2000
+
+def first_circle_hits(centers, radii, ids, grid=None):
+    """The first circle (lowest id) each circle touches
+
+    Parameters
+    ----------
+    centers : ndarray, shape (circles, 2)
+        the circle centers
+    radii : ndarray, shape (circles,)
+        the circle radii
+    ids : ndarray of int, shape (circles,)
+        the object id of every circle
+    grid : SpatialHash
+        the broad phase, only circles sharing one of its cells are tested.
+        Without it, or with only a few circles, every pair is tested.
+
+    Returns
+    -------
+    hit : ndarray of int, shape (circles,)
+        the index of the circle each circle touches first, -1 for none
+    """
+    n = len(centers)
+    if n == 0:
+        return np.zeros(0, dtype=int)
+    none = np.iinfo(np.int64).max
+    if grid is None or n * (n - 1) // 2 < GRID_MIN_PAIRS:
+        # Every circle against every circle, the lowest id touching wins
+        d = centers[:, None, :] - centers[None, :, :]
+        touching = np.sqrt(d[..., 0]**2 + d[..., 1]**2) - (radii[:, None] + radii[None, :]) <= 0
+        np.fill_diagonal(touching, False)
+        first = np.where(touching, ids, none)
+        hit = first.argmin(axis=1)
+        hit[first[np.arange(n), hit] == none] = -1
+        return hit
+
+    i, j = grid.self_pairs(centers - radii[:, None], centers + radii[:, None])
+    d = centers[i] - centers[j]
+    touching = np.sqrt(d[:, 0]**2 + d[:, 1]**2) - (radii[i] + radii[j]) <= 0
+    i, j = i[touching], j[touching]
+
+    # The lowest id each circle touches, and then which circle has that id
+    first = np.full(n, none, dtype=np.int64)
+    np.minimum.at(first, i, ids[j])
+    np.minimum.at(first, j, ids[i])
+    hit = np.full(n, -1)
+    found = first != none
+    order = np.argsort(ids)
+    hit[found] = order[np.searchsorted(ids, first[found], sorter=order)]
+    return hit
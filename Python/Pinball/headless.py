@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Pinball without a window
+
+Plays games on a PinballEngine, the physics of PinballMachine with no Tk
+window, no keyboard and no real-time clock, so a game runs as fast as the
+physics allows.  The keys come from a script instead of a player, and all
+the random numbers (launched ball sizes, bounces off lines) come from one
+seeded generator, so the same script and seed always give the same game.
+
+    result = play(simple_policy, seed=1)
+    print(result['score'], result['drained'])
+
+Useful for trying out table designs and flipper policies in bulk, for
+regression tests of the physics and for profiling it.
+"""
+
+import time
+import numpy as np
+
+from pinball_game import PinballEngine, default_layout, default_regions, WIDTH, HEIGHT
+
+def simple_policy(engine):
+    """Launch a ball when the table is empty, flip when a ball falls near a flipper"""
+    n = len(engine.balls)
+    if (n == 0):
+        return 'z'
+    pos, vel = engine.balls.pos[:n], engine.balls.vel[:n]
+    falling = (pos[:,1] > HEIGHT - 220) & (vel[:,1] > 0)
+    middle = (WIDTH - 100) / 2.0
+    if (falling & (pos[:,0] < middle)).any():
+        return 'h'
+    if (falling & (pos[:,0] >= middle) & (pos[:,0] < WIDTH - 100)).any():
+        return 'k'
+    return None
+
+def play(script=None, ticks=20000, seed=0, layout=default_layout,
+         regions=default_regions, **constants):
+    """Play one game of pinball without a window
+
+    Parameters
+    ----------
+    script : dict or function
+        the keys pressed, either {tick: key} or a policy called every tick
+        as policy(engine) that returns a key or None.  None presses nothing.
+    ticks : integer
+        the most ticks to play, the game stops earlier when every ball is
+        launched and drained
+    seed : integer
+        seed of the random numbers of the game
+    layout : function
+        layout(canvas, bumper_multiplier) gives the table objects, see
+        default_layout
+    regions : function
+        regions() gives the table regions, see default_regions
+    constants :
+        PinballEngine constants for this game only, e.g. FRICTION=0.98
+
+    Returns
+    -------
+    result : dict
+        'score', 'drained' (number of balls drained), 'balls_left' (not yet
+        launched), 'ticks' played, 'events', the engine's log of
+        (kind, tick, ball id, ...) for every launch, score and drain, and
+        'alive', the ticks every ball still on the table has been in play
+    """
+    bumper = constants.get('BUMPER_MULTIPLIER', PinballEngine.BUMPER_MULTIPLIER)
+    engine = PinballEngine(layout(None, bumper), regions(),
+                           rng=np.random.default_rng(seed), **constants)
+    for tick in range(ticks):
+        if (callable(script)):
+            key = script(engine)
+        else:
+            key = (script or {}).get(tick)
+        engine.step(key)
+        if (engine.game_over()):
+            break
+    return {'score': engine.score, 'drained': engine.drained,
+            'balls_left': engine.balls_left, 'ticks': engine.tick,
+            'events': engine.events,
+            'alive': [engine.tick - ball.born for ball in engine.balls.balls]}
+
+if __name__ == '__main__':
+    for seed in range(5):
+        start = time.perf_counter()
+        result = play(simple_policy, seed=seed)
+        elapsed = time.perf_counter() - start
+        print("seed %d: score %d, %d balls drained in %d ticks (%.0f ticks/s)"
+              % (seed, result['score'], result['drained'], result['ticks'],
+                 result['ticks'] / elapsed))
@@ -11,14 +11,23 @@ import numpy as np
 from abc import ABC, abstractmethod
 import time
 
+from ballset import BallSet
+from spatialhash import SpatialHash
+from segments import Segments
+from circles import first_circle_hits
+
 # For console input, TKInter has its own keyboard handler
 #from keyboardmod import read_key
 
 WIDTH = 800
 HEIGHT = 800
 
+def _norm(v):
+    # Same as np.linalg.norm for a 2-vector, without its overhead
+    return math.sqrt(v.dot(v))
+
 # Could differentiate collision and wall friction from general friction
-# See PinballMachine for these constants
+# See PinballEngine for these constants
 # FRICTION = 0.99 # .99 # 0.95
 # GRAVITY = 0.1 # 0.1
 # BUMPER_MULTIPLIER = 2.0
@@ -73,18 +82,21 @@ class PinballObject(ABC):
         self.active = None
 
         PinballObject.id_counter += 1
-        print((type(self),self.id))
     
 class PinballLine(PinballObject):    
 
     def __init__(self, canvas, initx, inity, sizex, sizey, color, 
                  fixed = True, bumper = 1):   
         super().__init__(canvas, initx, inity, sizex, sizey, color, 0, 0, fixed, bumper)
-        self.shape = canvas.create_line(initx, inity, initx+sizex, inity+sizey, fill=color)
+        self.shape = canvas.create_line(initx, inity, initx+sizex, inity+sizey, fill=color) if canvas is not None else None
         self.active = False
         self.min = np.array([min(initx, initx + sizex), min(inity, inity + sizey)])
         self.max = np.array([max(initx, initx + sizex), max(inity, inity + sizey)])
 
+    def draw(self):
+        # Lines don't move
+        pass
+
 class PinballActuator(PinballLine):
     
     def __init__(self, canvas, 
@@ -110,6 +122,7 @@ class PinballActuator(PinballLine):
         self.action_bumper = 2.5*bumper
         
         self.keypress = keypress
+        self.moved = False
         
         self.active = False
         self.min = np.array([min(initx, initx + sizex), min(inity, inity + sizey)])
@@ -136,14 +149,20 @@ class PinballActuator(PinballLine):
             self.size = np.array([self.orig_sizex,self.orig_sizey]).astype('float64')
             self.bumper = self.orig_bumper
 
-        # Redraw
-        if (not np.array_equal(self.init, old_init) or not np.array_equal(self.size, old_size)):
-            self.canvas.delete(self.shape)
-            self.shape = self.canvas.create_line(self.init[0], self.init[1], self.init[0]+self.size[0], self.init[1]+self.size[1], fill=self.color)    
+        # Redraw on the next frame
+        changed = not np.array_equal(self.init, old_init) or not np.array_equal(self.size, old_size)
+        if (changed):
+            self.moved = True
     
         # print("Count: ", self.countdown_to_orig)
         # print("Init: ", self.init)
         # print("Size: ", self.size)
+        return changed
+
+    def draw(self):
+        if (self.moved and self.canvas is not None):
+            self.canvas.coords(self.shape, self.init[0], self.init[1], self.init[0]+self.size[0], self.init[1]+self.size[1])
+        self.moved = False
     
 class PinballCircle(PinballObject):
     
@@ -151,8 +170,10 @@ class PinballCircle(PinballObject):
     
     def __init__(self, canvas, initx, inity, sizex, sizey, color, 
                  velx = 0, vely = 0, fixed = False, bumper = 1, score = 0):
+        self.balls = None   # the BallSet holding center and speed, if any
+        self.slot = None
         super().__init__(canvas, initx, inity, sizex, sizey, color, velx, vely, fixed, bumper)
-        self.shape = canvas.create_oval(initx, inity, initx+sizex, inity+sizey, fill=color)
+        self.shape = canvas.create_oval(initx, inity, initx+sizex, inity+sizey, fill=color) if canvas is not None else None
         # Replace mass with default sizex*sizey if specified
         self.score = score
         self.active = True
@@ -160,9 +181,60 @@ class PinballCircle(PinballObject):
         self.contact_wall = np.array([False, False])
         assert sizex == sizey, "circles are not symmetric in x,y dims"
 
+        # The physics keeps its own position, the canvas only catches up in draw()
+        self.center = self.init + self.size/2.0
+        self.drawn_center = self.center.copy()
+        self.gone = False
+
+    # Balls in a BallSet keep center and speed in its arrays
+    @property
+    def center(self):
+        return self._center if self.balls is None else self.balls.pos[self.slot]
+
+    @center.setter
+    def center(self, value):
+        if self.balls is None:
+            self._center = value
+        else:
+            self.balls.pos[self.slot] = value
+
+    @property
+    def speed(self):
+        return self._speed if self.balls is None else self.balls.vel[self.slot]
+
+    @speed.setter
+    def speed(self, value):
+        if self.balls is None:
+            self._speed = value
+        else:
+            self.balls.vel[self.slot] = value
+
+    def attach(self, balls, slot):
+        self.balls = balls
+        self.slot = slot
+
+    def detach(self, center, speed):
+        self.balls = None
+        self.slot = None
+        self._center = center
+        self._speed = speed
+
     def get_center(self):
-        pos = self.canvas.coords(self.shape)
-        return np.array([(pos[0] + pos[2])/2.0, (pos[1] + pos[3])/2.0])
+        return self.center
+
+    def get_bbox(self):
+        # (x0, y0, x1, y1) like canvas.coords gives for the oval
+        return (self.center[0] - self.radius, self.center[1] - self.radius,
+                self.center[0] + self.radius, self.center[1] + self.radius)
+
+    def draw(self):
+        if (self.canvas is None):
+            return
+        if (self.gone):
+            self.canvas.delete(self.shape)
+        elif (not np.array_equal(self.center, self.drawn_center)):
+            self.canvas.coords(self.shape, *self.get_bbox())
+            self.drawn_center[:] = self.center
 
     # https://www.mathsisfun.com/physics/momentum-animation.html
     def is_collision(self, objs):
@@ -214,17 +286,19 @@ class PinballCircle(PinballObject):
                     return obj     
         return None
 
-    def ball_update(self, objs, regions):
-        
-        ret_score = 0
-        
+    def move(self, objs, regions, dt=1.0, physics=None):
+        # One ball on its own, BallSet.step does this for all its balls at once
+        # physics is the engine with the constants, or the PinballEngine defaults
+        if (physics is None):
+            physics = PinballEngine
+
         # See if ball disappears
         for region in regions:
             if (region.disappears and region.in_region(self)):
                 objs.remove(self)
-                self.canvas.delete(self.shape) 
-                return ret_score
-        
+                self.gone = True  # deleted from the canvas on the next draw()
+                return
+
         # Check for boundary hit
         #old_pos = self.canvas.coords(self.shape)
         speedx = self.speed[0]
@@ -237,15 +311,12 @@ class PinballCircle(PinballObject):
         #     speedy = 0
         # elif (old_pos[3] + speedy > HEIGHT):
         #     speedy = 0
-            
+
         # Update position
-        self.canvas.move(self.shape, speedx/2.0, speedy/2.0)
-        
-        # Remember the old position so that the wall hitting effects can take place
-        #pos = old_pos
-        pos = self.canvas.coords(self.shape)
-        
-        #(x=pos[0],y=pos[1])  
+        self.center[0] += speedx/2.0*dt
+        self.center[1] += speedy/2.0*dt
+
+        #(x=pos[0],y=pos[1])
         #          +----+
         #          |    |
         #          +----+
@@ -256,23 +327,43 @@ class PinballCircle(PinballObject):
         #    self.speedy = (self.speedy - copysign(1,self.speedy)) * -1
         
         if (not self.fixed):
-            #print("Speed: ",self.speed, " FRICTION: ", PinballMachine.FRICTION)
+            #print("Speed: ",self.speed, " FRICTION: ", physics.FRICTION)
             
             # Check for unusual friction regions (assuming no overlap)
             modified_friction = self.get_friction(regions)
-            self.speed *= math.sqrt(PinballMachine.FRICTION if modified_friction == None else modified_friction)
+            self.speed *= math.sqrt(physics.FRICTION if modified_friction == None else modified_friction)**dt
             
             # Check for unusual gravity regions (assuming no overlap)
             modified_gravity = self.get_gravity(regions)
-            self.speed[1] += (PinballMachine.GRAVITY if modified_gravity == None else modified_gravity)/2.0
+            self.speed[1] += (physics.GRAVITY if modified_gravity == None else modified_gravity)/2.0*dt
             
-            self.speed = np.minimum(self.speed,  PinballMachine.MAX_SPEED)
-            self.speed = np.maximum(self.speed, -PinballMachine.MAX_SPEED)
+            self.speed = np.minimum(self.speed,  physics.MAX_SPEED)
+            self.speed = np.maximum(self.speed, -physics.MAX_SPEED)
+
+    def ball_update(self, objs, regions, hit=False, dt=1.0, physics=None):
+        
+        ret_score = 0
+        # Random bounces come from the engine's rng, so seeded games repeat
+        rng = physics.rng if physics is not None else np.random
+        
+        # Balls in a BallSet were already drained, moved and accelerated by BallSet.step
+        if (self.balls is None):
+            self.move(objs, regions, dt, physics)
+            if (self.gone):
+                return ret_score
+        
+        # Remember the old position so that the wall hitting effects can take place
+        #pos = old_pos
+        pos = self.get_bbox()
         
         # Eventually should handle multiple collisions, but requires refactoring
         # such that we return a set of all collisions and the velocity changes of impacts
         # are additive
-        cobj = self.is_collision(objs)
+        if (hit is False):
+            cobj = self.is_collision(objs)
+        else:
+            # Already found for all balls at once (see PinballEngine.first_hits)
+            cobj = hit
         if (cobj != None and isinstance(cobj,PinballLine)):
             
             # Use Wiki article but final x difference should be a unit vector
@@ -285,7 +376,7 @@ class PinballCircle(PinballObject):
             # We're using collision point with line as x_2... see Proj above in collision with line
             P = self.get_center()
             x = cobj.init
-            N = np.array([-cobj.size[1],cobj.size[0]])/np.linalg.norm(cobj.size)
+            N = np.array([-cobj.size[1],cobj.size[0]])/_norm(cobj.size)
             C = (P-x).dot(N)
                 
             # Get the final projected point
@@ -293,7 +384,7 @@ class PinballCircle(PinballObject):
             
             diff_v1 = self.speed # object 2 is not moving
             diff_x1 = self.get_center() - Proj
-            diff_x1 /= np.linalg.norm(diff_x1)
+            diff_x1 /= _norm(diff_x1)
             
             # print("Collision speed before: ",(self.speed))
             
@@ -301,8 +392,8 @@ class PinballCircle(PinballObject):
                 bumper_mult = cobj.bumper # (PinballMachine.BUMPER_MULTIPLIER if cobj.bumper else 1.0) # see if other obj is bumper
                 # Mass coefficient 2*m_2/(m_1+m_2) = 2.0 since m_2 is infinite
                 self.speed = self.speed - 2.0 * diff_v1.dot(diff_x1) * diff_x1 * bumper_mult
-                self.speed[0] += np.random.uniform(-PinballCircle.RANDOM_LINE_PERTURB, PinballCircle.RANDOM_LINE_PERTURB)
-                self.speed[1] += np.random.uniform(-PinballCircle.RANDOM_LINE_PERTURB, PinballCircle.RANDOM_LINE_PERTURB)
+                self.speed[0] += rng.uniform(-PinballCircle.RANDOM_LINE_PERTURB, PinballCircle.RANDOM_LINE_PERTURB)
+                self.speed[1] += rng.uniform(-PinballCircle.RANDOM_LINE_PERTURB, PinballCircle.RANDOM_LINE_PERTURB)
             
         elif (cobj != None and isinstance(cobj,PinballCircle) and self.id > cobj.id):
             
@@ -319,11 +410,11 @@ class PinballCircle(PinballObject):
             
             diff_v1 = self.speed - cobj.speed
             diff_x1 = self.get_center() - cobj.get_center()
-            diff_x1 /= np.linalg.norm(diff_x1)
+            diff_x1 /= _norm(diff_x1)
             
             diff_v2 = cobj.speed - self.speed
             diff_x2 = cobj.get_center() - self.get_center()
-            diff_x2 /= np.linalg.norm(diff_x2)
+            diff_x2 /= _norm(diff_x2)
 
             if (not self.fixed):
                 bumper_mult1 = cobj.bumper # (PinballMachine.BUMPER_MULTIPLIER if cobj.bumper else 1.0) # see if other obj is bumper
@@ -378,12 +469,69 @@ class PinballRegion(ABC):
         return (self.initx < pos[0] and pos[0] < self.initx + self.sizex 
                 and self.inity < pos[1] and pos[1] < self.inity + self.sizey)
 
-class PinballMachine:
-    
-    TK = Tk()
-    CANVAS = Canvas(TK, width=WIDTH, height=HEIGHT, bg="gray")
-    CANVAS.pack()
+    def contains(self, points):
+        # in_region for an (n, 2) array of centers at once
+        x, y = points[:, 0], points[:, 1]
+        return ((self.initx < x) & (x < self.initx + self.sizex)
+                & (self.inity < y) & (y < self.inity + self.sizey))
+
+def default_layout(canvas=None, bumper_multiplier=2.0):
+    # The table, drawn on canvas (None for no window). Makes new objects every
+    # call, since the machine changes them as it plays.
+    CANVAS = canvas
+    BUMPER_MULTIPLIER = bumper_multiplier
+    return [       # beyond color: velx, vely, fixed?, bumper?
+                      PinballCircle(CANVAS,WIDTH-75,HEIGHT-550,50,50,"lightblue",0,-14.0,False,2.0,10),
+                      PinballCircle(CANVAS,WIDTH-75,HEIGHT-450,50,50,"blue",0,-12.0,False,2.0,10),
+                      #khPinballCircle(CANVAS,WIDTH-75,HEIGHT-350,20,20,"darkblue",0,-14.0),
+                      PinballCircle(CANVAS,(WIDTH-100)/2-50,-25,100,100,"red",0,0,True,BUMPER_MULTIPLIER,10),
+                      PinballCircle(CANVAS,(WIDTH-100)/2-200,150,50,50,"orange",0,0,True,BUMPER_MULTIPLIER,5),
+                      PinballCircle(CANVAS,(WIDTH-100)/2+150,150,50,50,"orange",0,0,True,BUMPER_MULTIPLIER,5),
+                      PinballCircle(CANVAS,(WIDTH-100)/2-25,300,50,50,"green",0,0,True,BUMPER_MULTIPLIER,5),
+                      # Left and right top slanted lines
+                      PinballLine(CANVAS,0,100,100,-100,"red",True,BUMPER_MULTIPLIER),
+                      PinballLine(CANVAS,WIDTH-100,0,100,100,"red",True,BUMPER_MULTIPLIER),
+                      # Middle line
+                      #PinballLine(CANVAS,(WIDTH-100)/2-100,500,200,0,"green",True,BUMPER_MULTIPLIER),
+                      #PinballCircle(CANVAS,(WIDTH-100)/2-200,500,100,100,"green",0,0,True,1.5,5),
+                      #PinballCircle(CANVAS,(WIDTH-100)/2+100,500,100,100,"green",0,0,True,1.5,5),
+                      
+                      # Bumpers
+                      PinballActuator(CANVAS,
+                                      0,HEIGHT-150,-50 + (WIDTH-100)/2.0,50,
+                                      0,HEIGHT-150,-50 + (WIDTH-100)/2.0,25,
+                                      "red",True, BUMPER_MULTIPLIER, 'h', 10),
+                      #PinballActuator(CANVAS,
+                      #                0,HEIGHT-150,-50 + (WIDTH-100)/2.0,50,
+                      #                0,HEIGHT-125,WIDTH,0,
+                      #                "red",True, BUMPER_MULTIPLIER, 'u', 10),
+                      PinballActuator(CANVAS,
+                                      50 + (WIDTH-100)/2.0,HEIGHT-100,
+                                      WIDTH-100 - 50 - (WIDTH-100)/2.0,-50,
+                                      50 + (WIDTH-100)/2.0,HEIGHT-125,
+                                      WIDTH-100 - 50 - (WIDTH-100)/2.0,-25,
+                                      "red",True, BUMPER_MULTIPLIER, 'k', 10),
+                      # LHS vertical line
+                      PinballLine(CANVAS,98,150,2,0,"black", True),
+                      PinballLine(CANVAS,100,150,0,HEIGHT-400,"black", True, 1),
+                      PinballLine(CANVAS,98,150,0,HEIGHT-400,"blue", True, BUMPER_MULTIPLIER*2),
+                      # RHS vertical line
+                      PinballLine(CANVAS,WIDTH-100,150,2,0,"black", True),
+                      PinballLine(CANVAS,WIDTH-100,150,0,HEIGHT-150,"black", True),
+                      PinballLine(CANVAS,WIDTH-98,150,0,HEIGHT-150,"black", True)]
+
+def default_regions():
+    return [       # The region at bottom where balls disappear
+                      PinballRegion(0,HEIGHT-30,WIDTH,30, True, None, None),
+                      PinballRegion(0,150,98,HEIGHT-400, False, 1.1, -2.0),
+                      PinballRegion((WIDTH-100)/2-220,130,90,90, False, None, -1.0),
+                      PinballRegion((WIDTH-100)/2+130,130,90,90, False, None, -1.0)
+                      ]
 
+class PinballEngine:
+    # The pinball physics on its own, without a window. PinballMachine adds
+    # the Tk window and keyboard, headless.py plays scripted games with it.
+    
     # # Frictionless balls in space
     # FRICTION = 1.00 # .99 # 0.95
     # GRAVITY = 0.0 # 0.1
@@ -448,52 +596,10 @@ class PinballMachine:
     BUMPER_MULTIPLIER = 2.0 # 2.0
     MAX_SPEED = 15.0
     BALL_LIMIT = 10
-    LAYOUT = [       # beyond color: velx, vely, fixed?, bumper?
-                      PinballCircle(CANVAS,WIDTH-75,HEIGHT-550,50,50,"lightblue",0,-14.0,False,2.0,10),
-                      PinballCircle(CANVAS,WIDTH-75,HEIGHT-450,50,50,"blue",0,-12.0,False,2.0,10),
-                      #khPinballCircle(CANVAS,WIDTH-75,HEIGHT-350,20,20,"darkblue",0,-14.0),
-                      PinballCircle(CANVAS,(WIDTH-100)/2-50,-25,100,100,"red",0,0,True,BUMPER_MULTIPLIER,10),
-                      PinballCircle(CANVAS,(WIDTH-100)/2-200,150,50,50,"orange",0,0,True,BUMPER_MULTIPLIER,5),
-                      PinballCircle(CANVAS,(WIDTH-100)/2+150,150,50,50,"orange",0,0,True,BUMPER_MULTIPLIER,5),
-                      PinballCircle(CANVAS,(WIDTH-100)/2-25,300,50,50,"green",0,0,True,BUMPER_MULTIPLIER,5),
-                      # Left and right top slanted lines
-                      PinballLine(CANVAS,0,100,100,-100,"red",True,BUMPER_MULTIPLIER),
-                      PinballLine(CANVAS,WIDTH-100,0,100,100,"red",True,BUMPER_MULTIPLIER),
-                      # Middle line
-                      #PinballLine(CANVAS,(WIDTH-100)/2-100,500,200,0,"green",True,BUMPER_MULTIPLIER),
-                      #PinballCircle(CANVAS,(WIDTH-100)/2-200,500,100,100,"green",0,0,True,1.5,5),
-                      #PinballCircle(CANVAS,(WIDTH-100)/2+100,500,100,100,"green",0,0,True,1.5,5),
-                      
-                      # Bumpers
-                      PinballActuator(CANVAS,
-                                      0,HEIGHT-150,-50 + (WIDTH-100)/2.0,50,
-                                      0,HEIGHT-150,-50 + (WIDTH-100)/2.0,25,
-                                      "red",True, BUMPER_MULTIPLIER, 'h', 10),
-                      #PinballActuator(CANVAS,
-                      #                0,HEIGHT-150,-50 + (WIDTH-100)/2.0,50,
-                      #                0,HEIGHT-125,WIDTH,0,
-                      #                "red",True, BUMPER_MULTIPLIER, 'u', 10),
-                      PinballActuator(CANVAS,
-                                      50 + (WIDTH-100)/2.0,HEIGHT-100,
-                                      WIDTH-100 - 50 - (WIDTH-100)/2.0,-50,
-                                      50 + (WIDTH-100)/2.0,HEIGHT-125,
-                                      WIDTH-100 - 50 - (WIDTH-100)/2.0,-25,
-                                      "red",True, BUMPER_MULTIPLIER, 'k', 10),
-                      # LHS vertical line
-                      PinballLine(CANVAS,98,150,2,0,"black", True),
-                      PinballLine(CANVAS,100,150,0,HEIGHT-400,"black", True, 1),
-                      PinballLine(CANVAS,98,150,0,HEIGHT-400,"blue", True, BUMPER_MULTIPLIER*2),
-                      # RHS vertical line
-                      PinballLine(CANVAS,WIDTH-100,150,2,0,"black", True),
-                      PinballLine(CANVAS,WIDTH-100,150,0,HEIGHT-150,"black", True),
-                      PinballLine(CANVAS,WIDTH-98,150,0,HEIGHT-150,"black", True)]
-    
-    REGIONS = [       # The region at bottom where balls disappear
-                      PinballRegion(0,HEIGHT-30,WIDTH,30, True, None, None),
-                      PinballRegion(0,150,98,HEIGHT-400, False, 1.1, -2.0),
-                      PinballRegion((WIDTH-100)/2-220,130,90,90, False, None, -1.0),
-                      PinballRegion((WIDTH-100)/2+130,130,90,90, False, None, -1.0)
-                      ]
+    SUBSTEPS = 1          # physics steps per tick, more for fewer missed collisions
+    CONTINUOUS_COLLISIONS = True   # stop balls where they hit a line, never through it
+    GRID_CELL = 64        # cell size of the collision grid
+    # LAYOUT and REGIONS: see default_layout() and default_regions()
     
     # Pinball!
     # FRICTION = 0.995 # .99 # 0.95
@@ -570,16 +676,137 @@ class PinballMachine:
     #                   #PinballRegion((WIDTH-100)/2+130,130,90,90, False, None, -1.0)
     #                   ]
     
+    def __init__(self, objs, regions, canvas=None, rng=None, verbose=False, **constants):
+        # Any of the constants above can be changed for this engine only,
+        # e.g. PinballEngine(objs, regions, FRICTION=0.98)
+        # verbose prints every object as it joins the table
+        for name, value in constants.items():
+            if (not name.isupper() or not hasattr(PinballEngine, name)):
+                raise TypeError("unknown pinball constant %r" % name)
+            setattr(self, name, value)
+        self.canvas = canvas
+        self.rng = rng if rng is not None else np.random
+        self.objs = objs
+        self.regions = regions
+        self.verbose = verbose
+        # Objects are numbered per engine, in the order of objs, so two
+        # engines built from the same layout give the same ids and events
+        self.next_id = 0
+        for obj in self.objs:
+            self.number(obj)
+        self.balls_left = self.BALL_LIMIT
+        self.score = 0
+        self.drained = 0
+        self.tick = 0
+        self.events = []  # (kind, tick, ball id, ...) for every launch, score and drain
+        self.gone = []   # balls drained since the last draw()
+        # All moving balls get gravity, friction and regions at once
+        self.balls = BallSet()
+        for obj in self.objs:
+            if (isinstance(obj, PinballCircle) and not obj.fixed):
+                self.balls.add(obj)
+                obj.born = 0
+        # Circles are tested against each other all at once, on crowded
+        # tables only when they share a cell of the collision grid
+        self.fixed = [obj for obj in self.objs if isinstance(obj, PinballCircle) and obj.balls is None]
+        self.grid = SpatialHash(self.GRID_CELL)
+        # Lines are tested against all balls at once, with their own grid
+        self.segments = Segments([obj for obj in self.objs if isinstance(obj, PinballLine)],
+                                 self.GRID_CELL)
+        self.actuators = [obj for obj in self.objs if isinstance(obj, PinballActuator)]
+
+    def number(self, obj):
+        # Give obj the next id of this engine
+        obj.id = self.next_id
+        self.next_id += 1
+        if (self.verbose):
+            print((type(obj),obj.id))
+
+    def first_hits(self):
+        # What every ball and fixed circle hits first, found for all of them
+        # at once. Only circles that hit something or touch a wall are in it.
+        n = len(self.balls)
+        self.fixed = [obj for obj in self.fixed if not obj.gone]
+        circles = self.balls.balls + self.fixed
+        centers = np.concatenate((self.balls.pos[:n], np.reshape([obj.center for obj in self.fixed], (-1, 2))))
+        radii = np.concatenate((self.balls.radius[:n], [obj.radius for obj in self.fixed]))
+        ids = np.array([obj.id for obj in circles], dtype=np.int64)
+        circle_hits = first_circle_hits(centers, radii, ids, self.grid)
+        # A line can't push a fixed circle, so those skip the lines
+        line_hits = self.segments.first_hits(centers[:n], radii[:n]) + [None] * len(self.fixed)
+        walls = ((centers - radii[:, None] <= 0) | (centers + radii[:, None] >= [WIDTH, HEIGHT])).any(axis=1)
+
+        hits = {}
+        for i in np.flatnonzero((circle_hits >= 0) | walls):
+            hits[circles[i]] = circles[circle_hits[i]] if circle_hits[i] >= 0 else None
+        for (i, line) in enumerate(line_hits):
+            # The first hit is whichever of the two comes first in objs
+            if (line is not None and (hits.get(circles[i]) is None or line.id < hits[circles[i]].id)):
+                hits[circles[i]] = line
+        return hits
+
+    def game_over(self):
+        return self.balls_left == 0 and len(self.balls) == 0
+
+    def step(self, input_str=None):
+        # One tick of physics, no Tk calls in here
+        if (input_str == 'z' and self.balls_left > 0):
+            self.balls_left -= 1
+            mult = self.rng.uniform(0.5,1.5)
+            ball = PinballCircle(self.canvas,WIDTH-75,HEIGHT-450,mult*40,mult*40,"black",0,-12.0)
+            ball.born = self.tick
+            self.number(ball)
+            self.objs.append(ball)
+            self.balls.add(ball)
+            self.events.append(('launch', self.tick, ball.id))
+
+        # Flippers move first, so every ball sees them in the same place
+        moved = [obj for obj in self.actuators if obj.handleActuation(input_str)]
+        if (moved):
+            self.segments.update(moved)
+
+        dt = 1.0 / self.SUBSTEPS
+        segments = self.segments if self.CONTINUOUS_COLLISIONS else None
+        for i in range(self.SUBSTEPS):
+            for ball in self.balls.step(self.regions, self.FRICTION,
+                                        self.GRAVITY, self.MAX_SPEED,
+                                        dt, segments):
+                self.objs.remove(ball)
+                ball.gone = True
+                self.gone.append(ball)
+                self.drained += 1
+                self.events.append(('drain', self.tick, ball.id, self.tick - ball.born))
+
+            hits = self.first_hits()
+            for obj in list(self.objs):
+                # A ball that hits nothing and is clear of the walls has nothing to do
+                if (obj.active and (obj.balls is None or obj in hits
+                                    or obj.contact_wall[0] or obj.contact_wall[1])):
+                    points = obj.ball_update(self.objs, self.regions, hits.get(obj), dt, self)
+                    if (points):
+                        self.score += points
+                        self.events.append(('score', self.tick, obj.id, points))
+                    if (obj.gone):
+                        self.gone.append(obj)
+        self.tick += 1
+
+class PinballMachine(PinballEngine):
+
+    TICK_MS = 5           # physics runs in fixed ticks of this much real time
+    FRAME_MS = 5          # time between frames drawn on the canvas
+    MAX_TICKS_PER_FRAME = 20   # stop catching up after a long stall
+    
     def __init__(self):
-        self.tk = PinballMachine.TK
-        self.canvas = PinballMachine.CANVAS
-        self.objs = PinballMachine.LAYOUT
-        self.regions = PinballMachine.REGIONS
-        self.balls_left = PinballMachine.BALL_LIMIT
+        self.tk = Tk()
+        canvas = Canvas(self.tk, width=WIDTH, height=HEIGHT, bg="gray")
+        canvas.pack()
+        super().__init__(default_layout(canvas, PinballEngine.BUMPER_MULTIPLIER), default_regions(), canvas,
+                         verbose=True)
         self.keyQueue = queue.Queue() 
+        self.lag = 0.0   # real time in ms not yet simulated
+        self.last_time = time.perf_counter()
         #self.start_keyboard_thread()
         self.tk.bind('<Key>', self.key_pressed)
-        self.score = 0
         self.score_text = self.canvas.create_text(45,30,fill="blue",font="Times 20 italic bold",
                         text=str(self.score))
         self.ball_text = self.canvas.create_text(WIDTH-45,30,fill="blue",font="Times 20 italic bold",
@@ -594,31 +821,41 @@ class PinballMachine:
         
     # Main processing loop
     def move_active(self):
-                
-        # Handle keypress   
-        input_str = None        
-        if (self.keyQueue.qsize() > 0):
-            input_str = self.keyQueue.get()
-            #print("You pressed: ", input_str)
-            if (input_str == 'q'):
-                sys.exit()
-                #os._exit(1)
-            elif (input_str == 'z' and self.balls_left > 0):
-                self.balls_left -= 1
-                mult = np.random.uniform(0.5,1.5)
-                self.objs.append(PinballCircle(self.canvas,WIDTH-75,HEIGHT-450,mult*40,mult*40,"black",0,-12.0))
+
+        # Fixed timestep: run as many ticks as real time has passed, however
+        # late Tk calls us, so the game plays the same at any frame rate
+        now = time.perf_counter()
+        self.lag = min(self.lag + (now - self.last_time) * 1000.0,
+                       PinballMachine.MAX_TICKS_PER_FRAME * PinballMachine.TICK_MS)
+        self.last_time = now
+        while (self.lag >= PinballMachine.TICK_MS):
+            self.lag -= PinballMachine.TICK_MS
+
+            # Handle keypress, at most one per tick
+            input_str = None        
+            if (self.keyQueue.qsize() > 0):
+                input_str = self.keyQueue.get()
+                #print("You pressed: ", input_str)
+                if (input_str == 'q'):
+                    sys.exit()
+                    #os._exit(1)
+            self.step(input_str)
+
+        # The canvas is only touched here, once per frame
+        self.draw()
            
-        # Hall ball update and actuation
+        # Queue next call to move_active
+        self.tk.after(PinballMachine.FRAME_MS, self.move_active) # 40, changed from 10ms to 30ms        
+
+    def draw(self):
+        # Push the physics state to the canvas, once per frame
+        for obj in self.gone:
+            obj.draw()
+        self.gone = []
         for obj in self.objs:
-            if obj.active:
-                self.score += obj.ball_update(self.objs, self.regions)
-            if (isinstance(obj,PinballActuator)):
-                obj.handleActuation(input_str)
+            obj.draw()
         self.canvas.itemconfig(self.score_text, text=str(self.score))
         self.canvas.itemconfig(self.ball_text, text=str(self.balls_left))
-           
-        # Queue next call to move_active
-        self.tk.after(5, self.move_active) # 40, changed from 10ms to 30ms        
 
     def key_pressed(self, event):
         c = event.char
@@ -641,4 +878,5 @@ class PinballMachine:
     #     inputThread = threading.Thread(target=self.read_kbd_input, args=(self.keyQueue,), daemon=True)
     #     inputThread.start()
 
-game = PinballMachine()
\ No newline at end of file
+if __name__ == '__main__':
+    game = PinballMachine()
\ No newline at end of file
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Vectorized narrow-phase collision test of balls against all lines
+
+Everything PinballCircle.is_collision works out per ball per line (the unit
+normal N, the bounding box min .. max) is worked out once here and kept in
+arrays, and the distance from every ball to every line is found in one go:
+
+    C = (P - x) . N         signed distance of center P from the line
+    Proj = P - C N          the nearest point on the (infinite) line
+
+A ball touches a line when |P - Proj| < radius and Proj is inside the
+line's bounding box, exactly as in is_collision.
+
+Given a grid cell size, the lines are also put in a SpatialHash and only the
+(ball, line) pairs that share a grid cell are tested, instead of every ball
+against every line.  Small tables skip the grid and test every pair.
+"""
+
+import numpy as np
+
+from spatialhash import SpatialHash
+
+class Segments:
+    """The lines of a table as arrays of start points, normals and bounding boxes
+
+    Parameters
+    ----------
+    lines : list of PinballLine
+        the lines, in order of id
+    cell : float
+        the grid cell size of the broad phase, None to test every pair
+    """
+
+    # With fewer (ball, line) pairs than this, testing them all is faster than the grid
+    GRID_MIN_PAIRS = 2000
+
+    def __init__(self, lines, cell=None):
+        self.lines = list(lines)
+        n = len(self.lines)
+        self.index = {line: i for (i, line) in enumerate(self.lines)}
+        self.start = np.zeros((n, 2))
+        self.size = np.zeros((n, 2))
+        self.length = np.zeros(n)
+        self.normal = np.zeros((n, 2))
+        self.lo = np.zeros((n, 2))
+        self.hi = np.zeros((n, 2))
+        self.grid = SpatialHash(cell) if cell else None
+        self.update(self.lines)
+
+    def update(self, lines):
+        """Read the geometry of lines again, for flippers that moved"""
+        for line in lines:
+            i = self.index[line]
+            self.start[i] = line.init
+            self.size[i] = line.size
+            self.length[i] = np.linalg.norm(line.size)
+            self.normal[i] = np.array([-line.size[1], line.size[0]]) / self.length[i]
+            self.lo[i] = line.min
+            self.hi[i] = line.max
+        if self.grid is not None:
+            self.grid.set_boxes(self.lo, self.hi)
+
+    def _pairs(self, lo, hi):
+        """The (ball, line) pairs to test for balls with bounding boxes lo..hi, by ball then line"""
+        n, m = len(lo), len(self.lines)
+        if (self.grid is not None and n * m >= Segments.GRID_MIN_PAIRS):
+            return self.grid.pairs(lo, hi)
+        return np.divmod(np.arange(n * m), max(m, 1))
+
+    def contacts(self, centers, radii):
+        """Every contact between a set of balls and the lines
+
+        Parameters
+        ----------
+        centers : ndarray, shape (balls, 2)
+            the ball centers
+        radii : ndarray, shape (balls,)
+            the ball radii
+
+        Returns
+        -------
+        ball, line : ndarray of int
+            the ball and line index of every contact, ordered by ball and
+            then line
+        dist : ndarray
+            the distance from the ball center to the line
+        proj : ndarray, shape (contacts, 2)
+            the nearest point of the line to the ball center
+        """
+        ball, line = self._pairs(centers - radii[:, None], centers + radii[:, None])
+        P = centers[ball]
+        normal = self.normal[line]
+        C = ((P - self.start[line]) * normal).sum(axis=-1)
+        proj = P - C[:, None] * normal
+        d = P - proj
+        dist = np.sqrt(d[:, 0]**2 + d[:, 1]**2)
+        hit = ((dist < radii[ball]) & (proj >= self.lo[line]).all(axis=-1)
+               & (proj <= self.hi[line]).all(axis=-1))
+        return ball[hit], line[hit], dist[hit], proj[hit]
+
+    def first_hits(self, centers, radii):
+        """The first line (lowest id) each ball touches, or None"""
+        ball, line, dist, proj = self.contacts(centers, radii)
+        hits = [None] * len(centers)
+        # nonzero is ordered by ball then line, so take the first of each ball
+        balls, first = np.unique(ball, return_index=True)
+        for (b, i) in zip(balls, first):
+            hits[b] = self.lines[line[i]]
+        return hits
+
+    def time_of_impact(self, centers, moves, radii, slop=1e-3):
+        """How far along its move each ball can go before it first touches a line
+
+        Swept circle test: the ball center moves from P to P + d, so its
+        signed distance from a line goes from C0 to C0 + t (d . N).  It
+        touches the line at the t where that reaches the radius, if the
+        touching point is inside the line's bounding box.  The ball is
+        stopped slop pixels inside the radius, so the normal collision test
+        sees the contact.
+
+        Parameters
+        ----------
+        centers, moves : ndarray, shape (balls, 2)
+            where the balls are and how far they want to move
+        radii : ndarray, shape (balls,)
+            the ball radii
+
+        Returns
+        -------
+        t : ndarray, shape (balls,)
+            the fraction of its move each ball can make, 1 if it hits nothing
+        """
+        t_ball = np.ones(len(centers))
+        if len(self.lines) == 0:
+            return t_ball
+        # The whole move has to be in the grid cells looked at
+        end = centers + moves
+        ball, line = self._pairs(np.minimum(centers, end) - radii[:, None],
+                                 np.maximum(centers, end) + radii[:, None])
+        P = centers[ball]
+        d = moves[ball]
+        normal = self.normal[line]
+        C0 = ((P - self.start[line]) * normal).sum(axis=-1)
+        v = (d * normal).sum(axis=-1)
+        r = radii[ball]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (np.abs(C0) - (r - slop)) / np.abs(v)
+            # Where the contact is on the line, which must be inside its bounding box
+            contact = P + t[:, None] * d - (C0 + t * v)[:, None] * normal
+        # Only lines the ball is not touching yet and is moving towards
+        hit = (C0 * v < 0) & (np.abs(C0) >= r) & (t >= 0) & (t <= 1)
+        hit &= (contact >= self.lo[line]).all(axis=-1) & (contact <= self.hi[line]).all(axis=-1)
+        np.minimum.at(t_ball, ball[hit], t[hit])
+        return t_ball
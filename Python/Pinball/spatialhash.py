@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Broad-phase collision detection for the pinball table
+
+The table is cut into a uniform grid of square cells, and bounding boxes
+are listed in every cell they touch, all as arrays with no Python loop
+over the balls.  Only pairs of boxes that share a cell go on to the exact
+(batched) collision tests.
+
+Segments lists the lines with set_boxes() when it is built and again only
+when a flipper moves, and pairs() then gives every (ball, line) pair
+sharing a cell.  first_circle_hits in circles.py has no fixed list: the balls and the
+fixed circles are binned together every substep and self_pairs() gives
+every pair of circles sharing a cell.
+"""
+
+import numpy as np
+
+def _offsets(count):
+    """0, 1, .., count[k] - 1 for every k, all in one array"""
+    return np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+
+def box_cells(lo, hi, cell):
+    """Every cell each of the boxes lo..hi touches
+
+    Returns
+    -------
+    box : ndarray of int
+        the box of every (box, cell) entry
+    key : ndarray of int64
+        the cell of every entry, row and column in one number
+    """
+    i0 = np.floor(np.asarray(lo) / cell).astype(np.int64).reshape(-1, 2)
+    i1 = np.floor(np.asarray(hi) / cell).astype(np.int64).reshape(-1, 2)
+    span = i1 - i0 + 1
+    box = np.repeat(np.arange(len(i0)), span[:, 0] * span[:, 1])
+    k = _offsets(span[:, 0] * span[:, 1])
+    row = i0[box, 0] + k // span[box, 1]
+    col = i0[box, 1] + k % span[box, 1]
+    return box, (row << 32) + col
+
+def _unique_pairs(a, b, n):
+    """The distinct pairs (a, b), ordered by a and then b"""
+    code = np.sort(a * n + b)
+    code = code[np.r_[True, code[1:] != code[:-1]]] if len(code) else code
+    return code // n, code % n
+
+class SpatialHash:
+    """Uniform grid over the table listing the boxes in every cell
+
+    Parameters
+    ----------
+    cell : float
+        the side of a grid cell in pixels, about the size of a ball works well
+    """
+
+    def __init__(self, cell=64.0):
+        self.cell = float(cell)
+
+    def set_boxes(self, lo, hi):
+        """List the fixed boxes lo..hi (arrays, one row per box) for pairs()"""
+        box, key = box_cells(lo, hi, self.cell)
+        order = np.argsort(key, kind='stable')
+        self.box_key = key[order]
+        self.box = box[order]
+        self.boxes = len(lo)
+
+    def pairs(self, lo, hi):
+        """Every (box, fixed box) pair of the boxes lo..hi and the set_boxes boxes that share a cell
+
+        Returns
+        -------
+        i, j : ndarray of int
+            the box and fixed box of every pair, ordered by i and then j
+        """
+        box, key = box_cells(lo, hi, self.cell)
+        left = np.searchsorted(self.box_key, key, 'left')
+        count = np.searchsorted(self.box_key, key, 'right') - left
+        i = np.repeat(box, count)
+        j = self.box[np.repeat(left, count) + _offsets(count)]
+        return _unique_pairs(i, j, max(self.boxes, 1))
+
+    def self_pairs(self, lo, hi):
+        """Every pair of the boxes lo..hi that share a cell
+
+        Returns
+        -------
+        i, j : ndarray of int
+            the two boxes of every pair, i < j, ordered by i and then j
+        """
+        box, key = box_cells(lo, hi, self.cell)
+        order = np.argsort(key, kind='stable')
+        box, key = box[order], key[order]
+        n = len(key)
+        if n == 0:
+            return box, box
+        # Pair every entry with the entries after it in the same cell
+        start = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        end = np.r_[start[1:], n]
+        after = np.repeat(end, end - start) - np.arange(n) - 1
+        first = np.repeat(np.arange(n), after)
+        second = first + 1 + _offsets(after)
+        a, b = box[first], box[second]
+        return _unique_pairs(np.minimum(a, b), np.maximum(a, b), max(len(lo), 1))
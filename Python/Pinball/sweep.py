@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Pinball table-design sweeps over a process pool
+
+Plays many headless games (see headless.py) for every configuration in a
+grid or random sample of table designs and reports the score distribution
+and mean ball lifetime of each.  A configuration is a dict: upper case keys
+are PinballEngine constants (FRICTION, GRAVITY, BUMPER_MULTIPLIER,
+MAX_SPEED, ...), 'layout' and 'regions' are the layout and regions
+functions (bumper_layout and bumper_regions by default) and any other keys
+are passed to both, e.g. spread and drop to move the bumpers around.
+
+    configs = grid(FRICTION=[0.98, 0.99], BUMPER_MULTIPLIER=[1.5, 2.0], spread=[0, 40])
+    report(sweep(configs, games=200))
+
+Every configuration plays the same seeded games, so differences between
+configurations come from the table and not from luckier random numbers.
+Games are spread over a pool of processes and the results do not depend
+on the number of workers.
+"""
+
+import os
+import itertools
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pinball_game import PinballCircle, default_layout, default_regions, WIDTH
+from headless import play, simple_policy
+
+def bumper_layout(canvas=None, bumper_multiplier=2.0, spread=0.0, drop=0.0):
+    """default_layout with its bumpers moved
+
+    Parameters
+    ----------
+    spread : float
+        pixels the bumpers left and right of the middle move further out
+    drop : float
+        pixels all the bumpers move down
+    """
+    objs = default_layout(canvas, bumper_multiplier)
+    middle = (WIDTH - 100) / 2.0
+    for obj in objs:
+        if (isinstance(obj, PinballCircle) and obj.fixed):
+            # draw() moves the shape on the canvas to the new center
+            obj.center = obj.center + [np.sign(obj.center[0] - middle) * spread, drop]
+    return objs
+
+def bumper_regions(spread=0.0, drop=0.0):
+    """default_regions with the gravity wells around the bumpers moved like bumper_layout"""
+    regions = default_regions()
+    middle = (WIDTH - 100) / 2.0
+    for region in regions:
+        # Only the wells around the orange bumpers change gravity and not friction
+        if (not region.disappears and region.friction is None and region.gravity is not None):
+            x = region.initx + region.sizex / 2.0
+            region.initx += np.sign(x - middle) * spread
+            region.inity += drop
+    return regions
+
+def grid(**values):
+    """Every combination of the given values, e.g. grid(FRICTION=[0.98, 0.99], spread=[0, 40])"""
+    names = list(values)
+    return [dict(zip(names, combo)) for combo in itertools.product(*values.values())]
+
+def random_configs(n, seed=0, **ranges):
+    """n random configurations
+
+    Every keyword is either a (low, high) tuple, sampled uniformly, or a
+    list, sampled from, e.g. random_configs(20, FRICTION=(0.97, 0.995)).
+    """
+    rng = np.random.default_rng(seed)
+    configs = []
+    for i in range(n):
+        config = {}
+        for (name, r) in ranges.items():
+            if isinstance(r, tuple):
+                config[name] = float(rng.uniform(*r))
+            else:
+                config[name] = r[rng.integers(len(r))]
+        configs.append(config)
+    return configs
+
+def _play_config(config, seed, ticks, policy):
+    """One headless game of a configuration"""
+    constants = {k: v for (k, v) in config.items() if k.isupper()}
+    options = {k: v for (k, v) in config.items() if not k.isupper() and k not in ('layout', 'regions')}
+    layout = partial(config.get('layout', bumper_layout), **options)
+    regions = partial(config.get('regions', bumper_regions), **options)
+    return play(policy, ticks, seed, layout, regions, **constants)
+
+def _run_chunk(config, seeds, ticks, policy):
+    """Play a chunk of games of one configuration in a worker"""
+    scores = []
+    drained = []   # launch to drain of every drained ball
+    alive = []     # ticks in play of balls still on the table when the game stopped
+    for seed in seeds:
+        result = _play_config(config, seed, ticks, policy)
+        scores.append(result['score'])
+        drained.extend(e[3] for e in result['events'] if e[0] == 'drain')
+        alive.extend(result['alive'])
+    return scores, drained, alive
+
+def sweep(configs, games=100, ticks=20000, seed=0, workers=None,
+          policy=simple_policy, chunks_per_worker=4):
+    """Play games of every configuration over a process pool
+
+    Parameters
+    ----------
+    configs : list of dict
+        the table designs, see grid and random_configs
+    games : integer
+        the number of games of each configuration
+    ticks : integer
+        the most ticks in each game
+    seed : integer
+        seed that the games are spawned from, the same games for every
+        configuration
+    workers : integer
+        the number of processes, the number of cores by default
+    policy : function
+        the player, policy(engine) gives the key pressed every tick.  It
+        has to be a module level function so it can be sent to the workers.
+    chunks_per_worker : integer
+        games are handed out in this many chunks per worker
+
+    Returns
+    -------
+    results : list of dict
+        one per configuration, in order: 'config', 'score' (ndarray of the
+        score of every game), 'lifetime' (mean ticks in play of all balls,
+        nan if there were none), 'drained' (number of balls drained) and
+        'censored' (number of balls still on the table when their game ran
+        out of ticks).  Censored balls count with the ticks they had played,
+        so with any censored the lifetime is a lower bound.
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(games)
+    n_chunks = max(1, workers * chunks_per_worker // max(len(configs), 1))
+    chunks = [c for c in np.array_split(np.arange(games), n_chunks) if len(c)]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [[pool.submit(_run_chunk, config, [seeds[i] for i in c], ticks, policy)
+                    for c in chunks]
+                   for config in configs]
+        # Collect in submission order so the scores line up with the games
+        for (config, config_futures) in zip(configs, futures):
+            scores = []
+            drained = []
+            alive = []
+            for f in config_futures:
+                s, d, a = f.result()
+                scores.extend(s)
+                drained.extend(d)
+                alive.extend(a)
+            lifetimes = drained + alive
+            results.append({'config': config,
+                            'score': np.array(scores),
+                            'lifetime': np.mean(lifetimes) if lifetimes else np.nan,
+                            'drained': len(drained),
+                            'censored': len(alive)})
+    return results
+
+def _short(value):
+    if isinstance(value, float):
+        return "%.4g" % value
+    return getattr(value, '__name__', value)
+
+def report(results):
+    """Print the score distribution and mean ball lifetime of every configuration, best first
+
+    drained and censored are the number of balls that drained and that were
+    still in play at the end, a lifetime with censored balls is a lower bound.
+    """
+    print("%-50s %8s %8s %6s %6s %6s %9s %7s %8s" % ("configuration", "mean", "std", "p10", "p50", "p90",
+                                                    "lifetime", "drained", "censored"))
+    for r in sorted(results, key=lambda r: -r['score'].mean()):
+        name = ", ".join("%s=%s" % (k, _short(v)) for (k, v) in r['config'].items())
+        p10, p50, p90 = np.percentile(r['score'], [10, 50, 90])
+        print("%-50s %8.1f %8.1f %6.0f %6.0f %6.0f %9.1f %7d %8d"
+              % (name, r['score'].mean(), r['score'].std(), p10, p50, p90, r['lifetime'],
+                 r['drained'], r['censored']))
+
+if __name__ == '__main__':
+    configs = grid(FRICTION=[0.98, 0.99], BUMPER_MULTIPLIER=[1.5, 2.0], spread=[0, 40])
+    report(sweep(configs, games=20, ticks=10000))
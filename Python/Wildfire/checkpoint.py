@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Checkpoint and restart for long wildfire runs
+
+A checkpoint holds the grids X, Y and T, the step number and the full state
+of the random generator, in one compressed .npz file.  Loading it and
+carrying on gives exactly the same fire as a run that was never stopped,
+as long as every random number comes from that generator (not from the
+global np.random).
+
+    X, Y, T = fire_run_checkpointed(X, steps=100000, filename='fire.npz')
+
+Run the same line again after an interruption and it picks up from the last
+checkpoint instead of starting over.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from wildfire import life_step_4
+
+def _to_json(value):
+    """json.dumps default for the numpy arrays in some bit generator states"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError("cannot store %r in a checkpoint" % type(value))
+
+def _like(value, template):
+    """value read back from JSON, with the arrays of template as arrays of the same dtype"""
+    if isinstance(template, np.ndarray):
+        return np.array(value, dtype=template.dtype)
+    if isinstance(template, dict):
+        return {k: _like(v, template[k]) if k in template else v for (k, v) in value.items()}
+    return value
+
+def save_checkpoint(filename, X, Y, T, rng, step):
+    """Write the grids, the step number and the state of rng to filename
+
+    Parameters
+    ----------
+    filename : string
+        the checkpoint file, replaced only once the new one is complete
+    X, Y, T : ndarray
+        the burning, burnt out and burn time grids
+    rng : np.random.Generator
+        the generator the run draws all its random numbers from
+    step : integer
+        the number of steps done so far
+    """
+    if not isinstance(rng, np.random.Generator):
+        raise TypeError("checkpoints need a np.random.Generator, not %r" % type(rng))
+    state = json.dumps(rng.bit_generator.state, default=_to_json)
+    # Write next to the old checkpoint and swap, so an interruption while
+    # saving never leaves a broken file behind
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez_compressed(f, X=X, Y=Y, T=T, step=step, rng=np.array(state))
+    os.replace(tmp, filename)
+
+def load_checkpoint(filename):
+    """Read a checkpoint written by save_checkpoint
+
+    Returns
+    -------
+    (X, Y, T, rng, step) : the grids, a generator in the saved state and the
+    number of steps done
+    """
+    with np.load(filename) as data:
+        X, Y, T = data['X'], data['Y'], data['T']
+        step = int(data['step'])
+        state = json.loads(str(data['rng']))
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    # JSON lost the array dtypes (uint32 keys for MT19937, uint64 for Philox,
+    # ...), a fresh generator of the same kind has them
+    bit_generator.state = _like(state, bit_generator.state)
+    return (X, Y, T, np.random.Generator(bit_generator), step)
+
+def fire_run_checkpointed(X, steps, filename, every=100, seed=0, life_step=life_step_4):
+    """Run a wildfire, checkpointing as it goes and resuming if it can
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional array of the cells burning at the start, ignored
+        when resuming from filename
+    steps : integer
+        the total number of steps of the run
+    filename : string
+        the checkpoint file, resumed from if it exists
+    every : integer
+        the number of steps between checkpoints
+    seed : integer
+        seed of the random generator of a new run
+    life_step : function
+        the step kernel, life_step(X,Y,T,rng) -> (X,Y,T), like life_step_4
+        or Landscape.step
+
+    Returns
+    -------
+    (X, Y, T) : the grids after the last step
+    """
+    if os.path.exists(filename):
+        (X, Y, T, rng, start) = load_checkpoint(filename)
+    else:
+        X = np.array(X, dtype=bool)
+        assert X.ndim == 2
+        Y = np.zeros_like(X)
+        T = np.zeros(X.shape)
+        rng = np.random.default_rng(seed)
+        start = 0
+
+    s = start
+    try:
+        while s < steps:
+            (X,Y,T) = life_step(X,Y,T,rng)
+            s += 1
+            if s % every == 0 or s == steps:
+                save_checkpoint(filename, X, Y, T, rng, s)
+    except KeyboardInterrupt:
+        # Keep the work since the last checkpoint too
+        save_checkpoint(filename, X, Y, T, rng, s)
+        raise
+    return (X,Y,T)
+
+if __name__ == '__main__':
+    # Every kind of bit generator has to come back in exactly the same state
+    for name in ('PCG64', 'MT19937', 'Philox', 'SFC64'):
+        rng = np.random.Generator(getattr(np.random, name)(0))
+        rng.random(3)
+        save_checkpoint('roundtrip_checkpoint.npz', X=np.zeros((2, 2), dtype=bool),
+                        Y=np.zeros((2, 2), dtype=bool), T=np.zeros((2, 2)), rng=rng, step=0)
+        restored = load_checkpoint('roundtrip_checkpoint.npz')[3]
+        assert np.array_equal(rng.random(100), restored.random(100)), name
+    os.remove('roundtrip_checkpoint.npz')
+
+    X = np.zeros((2000, 2000), dtype=bool)
+    X[1000, 1000:1003] = True
+    (X, Y, T) = fire_run_checkpointed(X, steps=2000, filename='wildfire_checkpoint.npz')
+    print("burning %d, burnt out %d" % (np.count_nonzero(X), np.count_nonzero(Y)))
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Wildfire on one byte per cell
+
+life_step_4 keeps a bool X, a bool Y and a float64 T for every cell (10
+bytes) and allocates several more whole-grid arrays every step (the padded
+board, the counts, the float64 random numbers, Xnew).  Here the whole state
+of a cell is one uint8, the state index that render.py draws:
+
+* UNBURNT (0), never burnt
+* BURNT (1), burnt out
+* BURNING + T, burning for T steps
+
+Two such grids are swapped every step (double buffering), and the grid is
+updated a band of rows at a time, so the only scratch memory is a few
+band-sized buffers allocated once.  That is 2 bytes per cell in total, so
+continent-sized grids fit in memory.
+
+With the same random stream the fire is exactly the one of life_step_4: the
+random numbers are drawn in the same row-major order, one band after the
+other.
+
+    fire = CompactFire(pack_fire(X, Y, T), np.random.default_rng(0))
+    fire.run(400)
+    X, Y, T = unpack_fire(fire.S)
+"""
+
+import numpy as np
+
+from wildfire import MAX_TIME, NEIGHBOURS
+from render import UNBURNT, BURNT, BURNING, fire_state_index
+
+assert BURNING + MAX_TIME <= 255, "burn times must fit in a uint8"
+
+# Chance that an unburnt cell catches fire, by number of burning neighbours
+P_IGNITE = np.array([0.00001, 0.001, 0.001, 0.25, 0.25, 0.25, 0.25, 0.25, 0.25])
+
+def pack_fire(X, Y, T):
+    """The uint8 state grid of (X, Y, T)"""
+    return fire_state_index(X, Y, T)
+
+def unpack_fire(S):
+    """The (X, Y, T) grids of a uint8 state grid"""
+    X = S >= BURNING
+    Y = S == BURNT
+    T = np.where(X, S.astype(float) - BURNING, 0.0)
+    return (X, Y, T)
+
+class CompactFire:
+    """Wildfire on a uint8 state grid, with no allocations per step
+
+    Parameters
+    ----------
+    S : array_like
+        the state of every cell, see pack_fire
+    rng : numpy random generator
+        a np.random.Generator or RandomState, the global np.random by default
+    band : integer
+        the number of rows updated at a time, which sets the scratch memory
+    """
+
+    def __init__(self, S, rng=None, band=256):
+        self.S = np.array(S, dtype=np.uint8)
+        assert self.S.ndim == 2
+        self.spare = np.empty_like(self.S)
+        self.rng = rng if rng is not None else np.random
+        self.rows, self.cols = self.S.shape
+        self.band = max(1, min(band, self.rows))
+        self.generation = 0
+        # Band sized scratch, reused every step
+        h, cols = self.band, self.cols
+        self.fire = np.zeros((h + 2, cols + 2), dtype=np.uint8)
+        self.count = np.empty((h, cols), dtype=np.intp)  # np.take indices
+        self.u = np.empty((h, cols))
+        self.p = np.empty((h, cols))
+        self.mask = np.empty((h, cols), dtype=bool)
+        self.mask2 = np.empty((h, cols), dtype=bool)
+
+    def _uniform(self, u):
+        """Fill u with uniform random numbers in [0, 1)"""
+        if isinstance(self.rng, np.random.Generator):
+            self.rng.random(out=u)
+        else:
+            # RandomState has no out=, this allocates one band
+            u[...] = self.rng.uniform(0, 1, u.shape)
+
+    def _step_band(self, a, b):
+        S, new = self.S[a:b], self.spare[a:b]
+        h, cols = b - a, self.cols
+
+        # Burning cells of rows a-1 .. b, with a border of zeros off the edge
+        fire = self.fire[:h+2]
+        fire[0] = 0
+        fire[h+1] = 0
+        lo, hi = max(a - 1, 0), min(b + 1, self.rows)
+        np.greater_equal(self.S[lo:hi], BURNING, out=fire[lo-a+1:hi-a+1, 1:cols+1])
+        count = self.count[:h]
+        count[...] = 0
+        for (i, j) in NEIGHBOURS:
+            count += fire[1+i:h+1+i, 1+j:cols+1+j]
+
+        u, p = self.u[:h], self.p[:h]
+        m, m2 = self.mask[:h], self.mask2[:h]
+        self._uniform(u)
+
+        # Burning cells get one step older and burn out at MAX_TIME
+        np.copyto(new, S)
+        np.greater_equal(S, BURNING, out=m)
+        np.add(new, 1, out=new, where=m)
+        np.greater_equal(new, BURNING + MAX_TIME, out=m)
+        np.copyto(new, BURNT, where=m)
+
+        # Unburnt cells catch fire
+        np.take(P_IGNITE, count, out=p, mode='clip')  # 'raise' would copy p
+        np.less(u, p, out=m)
+        np.equal(S, UNBURNT, out=m2)
+        m &= m2
+        np.copyto(new, BURNING, where=m)
+
+    def step(self):
+        """Advance the fire by one step, returns the new state grid"""
+        for a in range(0, self.rows, self.band):
+            self._step_band(a, min(a + self.band, self.rows))
+        self.S, self.spare = self.spare, self.S
+        self.generation += 1
+        return self.S
+
+    def run(self, steps):
+        """Advance the fire by steps steps, returns the new state grid"""
+        for _ in range(steps):
+            self.step()
+        return self.S
+
+    def burning(self):
+        """Number of burning cells"""
+        return int(np.count_nonzero(self.S >= BURNING))
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Frontier-only wildfire propagation
+
+Most of a forest is either untouched or already burnt, and neither changes
+unless a burning cell is next to it.  This engine keeps the burning cells as
+an explicit list and each step only looks at them and their unburnt
+neighbours, so the cost follows the fire perimeter instead of the map area.
+
+The rule is the one in life_step_3:
+
+* a burning cell keeps burning until its burn time T reaches MAX_TIME, then
+  it is burnt out (Y) for good
+* an unburnt cell with 3+ burning neighbours catches fire with probability
+  0.25, with 1 or 2 burning neighbours with probability 0.001
+* any other unburnt cell catches fire by itself with probability 0.00001.
+  Instead of one draw per cell, the number of such cells is drawn from a
+  binomial distribution and that many cells are picked at random.
+
+The fire is the same random process as life_step_3, but the random numbers
+are used differently, so a given seed does not give the same fire.
+"""
+
+import numpy as np
+
+from wildfire import MAX_TIME, NEIGHBOURS
+
+P_SPREAD_MANY = 0.25     # 3 or more burning neighbours
+P_SPREAD_FEW = 0.001     # 1 or 2 burning neighbours
+P_SPONTANEOUS = 0.00001  # no burning neighbours
+
+class FrontierFire:
+    """Wildfire that only evaluates burning cells and their neighbours
+
+    Parameters
+    ----------
+    X, Y, T : ndarray
+        the burning (bool), burnt out (bool) and burn time (float) grids,
+        updated in place every step, so they must be C-contiguous
+    rng : numpy random generator
+        a np.random.Generator or RandomState, the global np.random by default
+    """
+
+    def __init__(self, X, Y, T, rng=None):
+        assert X.flags.c_contiguous and Y.flags.c_contiguous and T.flags.c_contiguous
+        self.X = X
+        self.Y = Y
+        self.T = T
+        self.rng = rng if rng is not None else np.random
+        self.rows, self.cols = X.shape
+        # The explicit set of burning cells, as flat indices
+        self.burning = np.flatnonzero(X)
+        self.burnt = int(np.count_nonzero(Y))
+
+    def _neighbours(self, cells):
+        """Flat indices of all on-board neighbours of cells, with repeats"""
+        r, c = np.divmod(cells, self.cols)
+        out = []
+        for (i, j) in NEIGHBOURS:
+            ro, co = r + i, c + j
+            keep = (ro >= 0) & (co >= 0) & (ro < self.rows) & (co < self.cols)
+            out.append(ro[keep] * self.cols + co[keep])
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.intp)
+
+    def _spontaneous(self, candidates):
+        """Unburnt cells away from the fire that catch fire by themselves"""
+        X, Y = self.X.ravel(), self.Y.ravel()
+        eligible = X.size - len(self.burning) - self.burnt - len(candidates)
+        k = self.rng.binomial(eligible, P_SPONTANEOUS) if eligible > 0 else 0
+        chosen = np.zeros(0, dtype=np.intp)
+        # Rejection sampling, almost every cell is eligible on a big map
+        while len(chosen) < k:
+            cells = (self.rng.random(2 * (k - len(chosen))) * X.size).astype(np.intp)
+            cells = cells[~X[cells] & ~Y[cells] & ~np.isin(cells, candidates)]
+            # Drop repeats but keep the cells in the order they were drawn, so
+            # the first k are a uniform pick (np.unique alone sorts them and
+            # would favour the top rows)
+            cells = np.concatenate((chosen, cells))
+            _, first = np.unique(cells, return_index=True)
+            chosen = cells[np.sort(first)]
+        return chosen[:k]
+
+    def step(self):
+        """Advance the fire by one step, in place"""
+        X, Y, T = self.X.ravel(), self.Y.ravel(), self.T.ravel()
+        burning = self.burning
+        T[burning] += 1.0
+
+        # Unburnt neighbours of the fire and how many burning cells each touches
+        cells, count = np.unique(self._neighbours(burning), return_counts=True)
+        unburnt = ~X[cells] & ~Y[cells]
+        cells, count = cells[unburnt], count[unburnt]
+        p = np.where(count >= 3, P_SPREAD_MANY, P_SPREAD_FEW)
+        ignited = cells[self.rng.random(len(cells)) < p]
+        ignited = np.concatenate((ignited, self._spontaneous(cells)))
+
+        # Cells that reached MAX_TIME burn out
+        out = T[burning] >= MAX_TIME
+        X[burning[out]] = False
+        Y[burning[out]] = True
+        self.burnt += int(np.count_nonzero(out))
+
+        X[ignited] = True
+        self.burning = np.concatenate((burning[~out], ignited))
+        return (self.X, self.Y, self.T)
+
+def make_life_step_frontier(rng=None):
+    """Make a life_step(X,Y,T) function that keeps the fire front between calls
+
+    The grids are updated in place.  Passing in grids other than the ones
+    returned last time starts a new fire front from them.
+    """
+    state = {'fire': None}
+
+    def life_step_frontier(X, Y, T):
+        fire = state['fire']
+        if fire is None or X is not fire.X or Y is not fire.Y or T is not fire.T:
+            fire = state['fire'] = FrontierFire(X, Y, T, rng)
+        return fire.step()
+
+    return life_step_frontier
+
+if __name__ == '__main__':
+    # Spontaneous ignitions have to land anywhere on the map: the number of
+    # them in each band of rows should be flat
+    rows, bands = 1000, 10
+    X = np.zeros((rows, rows), dtype=bool)
+    fire = FrontierFire(X, np.zeros_like(X), np.zeros(X.shape), np.random.default_rng(0))
+    cells = np.concatenate([fire._spontaneous(np.zeros(0, dtype=np.intp)) for _ in range(2000)])
+    hist = np.bincount(cells // rows * bands // rows, minlength=bands)
+    expected = len(cells) / bands
+    print("spontaneous ignitions per band of rows:", hist)
+    assert np.all(np.abs(hist - expected) < 5 * np.sqrt(expected)), "spontaneous ignitions are not uniform"
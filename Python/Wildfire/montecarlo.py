@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Monte Carlo wildfire ensembles over a process pool
+
+Runs many independent wildfires from the same starting grid to get the
+distribution of burnt area and fire duration, and the probability that each
+cell burns.  Runs are spread over a pool of processes, every run has its own
+random stream spawned from one seed (so results do not depend on the number
+of workers), and nothing is rendered.
+
+    result = fire_ensemble(X, runs=10000, seed=0)
+    result['burn_probability']   # (rows, cols) fraction of runs each cell burnt in
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from wildfire import life_step_4
+from frontier import FrontierFire
+
+def fire_run(X, steps, rng, engine='vectorized'):
+    """One wildfire from starting grid X
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional array of the cells burning at the start
+    steps : integer
+        the largest number of steps to run
+    rng : np.random.Generator
+        the random stream of this run
+    engine : string
+        'vectorized' (life_step_4) or 'frontier' (FrontierFire)
+
+    Returns
+    -------
+    burnt : ndarray of bool
+        the cells that burnt at some point
+    duration : integer
+        the step at which the fire went out, or steps if it never did.  The
+        run only ends once something has burnt, since with nothing burning
+        at the start the fire has to start spontaneously first.
+    """
+    X = np.array(X, dtype=bool)
+    Y = np.zeros_like(X)
+    T = np.zeros(X.shape)
+    if engine == 'frontier':
+        fire = FrontierFire(X, Y, T, rng)
+        step = lambda: fire.step()
+    elif engine == 'vectorized':
+        step = lambda: life_step_4(X, Y, T, rng)
+    else:
+        raise ValueError("unknown engine %r" % engine)
+
+    duration = steps
+    for s in range(1, steps + 1):
+        step()
+        if not X.any() and Y.any():
+            duration = s
+            break
+    return X | Y, duration
+
+def _run_chunk(X, steps, seeds, engine):
+    """Run a chunk of fires in a worker and add up the results there"""
+    burn_count = np.zeros(np.shape(X), dtype=np.int64)
+    areas = []
+    durations = []
+    for seed in seeds:
+        burnt, duration = fire_run(X, steps, np.random.default_rng(seed), engine)
+        burn_count += burnt
+        areas.append(int(np.count_nonzero(burnt)))
+        durations.append(duration)
+    return burn_count, areas, durations
+
+def fire_ensemble(X, runs=1000, steps=400, seed=0, workers=None,
+                  engine='vectorized', chunks_per_worker=4):
+    """Monte Carlo ensemble of independent wildfires
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional array of the cells burning at the start
+    runs : integer
+        the number of fires
+    steps : integer
+        the largest number of steps in each fire
+    seed : integer
+        seed that the random stream of every run is spawned from
+    workers : integer
+        the number of processes, the number of cores by default
+    engine : string
+        'vectorized' (life_step_4) or 'frontier' (FrontierFire)
+    chunks_per_worker : integer
+        runs are handed out in this many chunks per worker
+
+    Returns
+    -------
+    result : dict
+        'burnt_area' : ndarray (runs,), the cells burnt in every run.
+        'duration' : ndarray (runs,), the step every fire went out.
+        'burn_probability' : ndarray (rows, cols), the fraction of runs in
+        which each cell burnt.
+    """
+    X = np.asarray(X).astype(bool)
+    assert X.ndim == 2
+    workers = workers or os.cpu_count() or 1
+    # Independent streams that only depend on the seed and the run number
+    seeds = np.random.SeedSequence(seed).spawn(runs)
+    chunks = [c for c in np.array_split(np.arange(runs), workers * chunks_per_worker) if len(c)]
+
+    burn_count = np.zeros(X.shape, dtype=np.int64)
+    areas = []
+    durations = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_chunk, X, steps, [seeds[i] for i in c], engine)
+                   for c in chunks]
+        # Collect in submission order so the arrays line up with the runs
+        for f in futures:
+            count, a, d = f.result()
+            burn_count += count
+            areas.extend(a)
+            durations.extend(d)
+
+    return {'burnt_area': np.array(areas),
+            'duration': np.array(durations),
+            'burn_probability': burn_count / max(runs, 1)}
+
+if __name__ == '__main__':
+    X = np.zeros((100, 100), dtype=bool)
+    X[50, 50] = True
+    result = fire_ensemble(X, runs=1000, steps=400)
+    print("burnt area: mean %.1f, std %.1f" % (result['burnt_area'].mean(), result['burnt_area'].std()))
+    print("duration:   mean %.1f, std %.1f" % (result['duration'].mean(), result['duration'].std()))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Numba-compiled version of the per-cell wildfire loop
+
+This is life_step_3 written the same readable way, cell by cell, but
+compiled by numba (pip install numba) with the rows spread over all cores.
+
+Each row draws its random numbers from its own splitmix64 stream, seeded
+from (seed, step, row).  So every row has private RNG state wherever it
+runs, and the fire only depends on the seed, not on the number of threads.
+It is the same random process as life_step_3 but not the same random
+numbers as np.random.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+from wildfire import MAX_TIME
+
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+@njit
+def _mix(z):
+    """splitmix64 finalizer"""
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+@njit(parallel=True)
+def life_step_numba(X, Y, T, count, seed, step):
+    """Compiled life_step_3, count is a scratch array the shape of X"""
+    rows = X.shape[0]
+    cols = X.shape[1]
+    for r in prange(rows):
+      for c in range(cols):
+        n = 0
+        if (X[r,c]):
+          T[r,c] = T[r,c] + 1.0
+        for i in range(-1, 2):
+          for j in range(-1, 2):
+            ro = r+i
+            co = c+j
+            if ((i != 0 or j != 0) and ro >= 0 and co >= 0 and ro < rows and co < cols and X[ro,co]):
+              n = n + 1
+        count[r,c] = n
+
+    # Only a cell's own X, Y and T change below, so rows are independent
+    for r in prange(rows):
+      state = _mix(np.uint64(seed) ^ _mix(np.uint64(step) * np.uint64(rows) + np.uint64(r)))
+      for c in range(cols):
+        state = state + GOLDEN
+        u = (_mix(state) >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+        n = count[r,c]
+        Xnew = (X[r,c] or (n >= 3 and u < 0.25) or (n >= 1 and u < 0.001) or (u < 0.00001)) and n < 9 and not Y[r,c] and (T[r,c] < MAX_TIME)
+        Y[r,c] = Y[r,c] or ((not Xnew) and X[r,c])
+        X[r,c] = Xnew
+
+def make_life_step_numba(seed=0):
+    """Make a life_step(X,Y,T) function running the compiled kernel
+
+    The scratch count array is kept between calls so nothing is allocated
+    per step, and the step number feeds the random streams.
+    """
+    state = {'count': None, 'step': 0}
+
+    def life_step_3_numba(X, Y, T):
+        count = state['count']
+        if count is None or count.shape != X.shape:
+            count = state['count'] = np.zeros(X.shape, dtype=np.int32)
+        life_step_numba(X, Y, T, count, seed, state['step'])
+        state['step'] += 1
+        return (X,Y,T)
+
+    return life_step_3_numba
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Streaming video encoder for wildfire runs
+
+life_animation builds a float composite image every frame, draws it with
+imshow and a colorbar and encodes the video twice.  Here every cell is
+reduced to a small state index instead (unburnt, burnt out, or burning for T
+steps) and a palette built once from the same colormap turns indices into
+uint8 pixels.  The simulation thread only hands the indices over a queue;
+a background thread does the palette lookup, integer upscaling and feeding
+of ffmpeg while the next state is computed.
+
+Cells are drawn as flat squares (no bilinear smoothing), and there is no
+colorbar.
+
+FrameEncoder follows the one in GameOfLife/render.py.  Wildfire and
+GameOfLife are separate folders that each run on their own with flat
+imports, so this one can't import it.  The difference is where the palette is
+applied: the Game of Life encoder takes finished RGB frames
+(board_to_frame runs in the simulation thread), while this one takes the
+state indices and does the palette lookup, upscaling and padding in its
+encoder thread.
+"""
+
+import subprocess
+import threading
+import queue
+
+import numpy as np
+
+from wildfire import MAX_TIME
+
+UNBURNT = 0
+BURNT = 1
+BURNING = 2   # burning for T steps is state BURNING + T
+
+def fire_palette():
+    """RGB uint8 color of every state index, as life_animation draws it
+
+    life_animation shows (T/(MAX_TIME-5))*X + (1-X)*-1 + Y*3 with the Reds
+    colormap, clim (-0.05, 1), green below and black above.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import Normalize
+    cmap = plt.cm.Reds.with_extremes(under='green', over='black')
+    T = np.arange(int(MAX_TIME) + 1)
+    values = np.concatenate(([-1.0, 2.0], T / (MAX_TIME - 5.0)))
+    rgba = cmap(Normalize(-0.05, 1)(values))
+    return np.round(rgba[:, :3] * 255).astype(np.uint8)
+
+def fire_state_index(X, Y, T):
+    """uint8 state index of every cell, see UNBURNT, BURNT and BURNING"""
+    index = np.where(Y, BURNT, UNBURNT).astype(np.uint8)
+    burning = (BURNING + np.clip(T, 0, MAX_TIME)).astype(np.uint8)
+    return np.where(X, burning, index)
+
+class FrameEncoder:
+    """Turn state index frames into video with ffmpeg in a background thread
+
+    Parameters
+    ----------
+    filename : string
+        the video file to write
+    shape : tuple
+        the (rows, cols) of the grid
+    palette : ndarray of uint8, shape (states, 3)
+        the RGB color of each state index
+    scale : integer
+        each cell becomes a scale x scale block of pixels
+    fps : integer
+        frames per second of the video
+    codec : string
+        the ffmpeg video codec
+    queue_size : integer
+        the number of frames that can wait for the encoder before write blocks
+    ffmpeg : string
+        the ffmpeg executable
+    """
+
+    def __init__(self, filename, shape, palette, scale=1, fps=10, codec='libx264',
+                 queue_size=64, ffmpeg='ffmpeg'):
+        self.shape = tuple(shape)
+        self.palette = palette
+        self.scale = scale
+        height, width = self.shape[0] * scale, self.shape[1] * scale
+        # yuv420p (playable everywhere) needs even dimensions, pad if needed
+        self.pad = (height % 2, width % 2)
+        self.proc = subprocess.Popen(
+            [ffmpeg, '-y', '-loglevel', 'error',
+             '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+             '-s', '%dx%d' % (width + self.pad[1], height + self.pad[0]),
+             '-r', str(fps), '-i', '-',
+             '-vcodec', codec, '-pix_fmt', 'yuv420p', filename],
+            stdin=subprocess.PIPE)
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._encode, daemon=True)
+        self.thread.start()
+
+    def _pixels(self, index):
+        frame = self.palette[index]
+        if self.scale > 1:
+            frame = np.repeat(np.repeat(frame, self.scale, axis=0), self.scale, axis=1)
+        if self.pad != (0, 0):
+            frame = np.pad(frame, ((0, self.pad[0]), (0, self.pad[1]), (0, 0)), mode='edge')
+        return frame.tobytes()
+
+    def _encode(self):
+        while True:
+            index = self.frames.get()
+            if index is None:
+                break
+            if self.error is not None:
+                continue  # keep draining so write never blocks forever
+            try:
+                self.proc.stdin.write(self._pixels(index))
+            except OSError as e:
+                self.error = e
+
+    def write(self, index):
+        """Queue one frame of state indices, which must not change afterwards"""
+        if self.error is not None:
+            raise self.error
+        assert index.shape == self.shape
+        self.frames.put(index)
+
+    def close(self, check=True):
+        """Wait for every queued frame to be encoded and finish the file
+
+        With check, a write error or ffmpeg failure is raised here.
+        """
+        self.frames.put(None)
+        self.thread.join()
+        self.proc.stdin.close()
+        returncode = self.proc.wait()
+        if not check:
+            return
+        if self.error is not None:
+            raise self.error
+        if returncode != 0:
+            raise RuntimeError("ffmpeg exited with status %d" % returncode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # An error in the with body matters more than what it did to ffmpeg
+        self.close(check=exc_type is None)
+
+def fire_render(X, life_step, frames=400, scale=8, fps=10, filename='basic_animation.mp4'):
+    """Render a wildfire run to a video file without matplotlib drawing
+
+    Parameters
+    ----------
+    X : array_like
+        a two-dimensional numpy array of the cells burning at the start
+    life_step : function
+        the step kernel, life_step(X,Y,T) -> (X,Y,T)
+    frames : integer
+        The number of frames to compute for the video
+    scale : integer
+        each cell becomes a scale x scale block of pixels
+    fps : integer
+        frames per second of the video
+    filename : string
+        the video file to write
+
+    Returns
+    -------
+    (X, Y, T) : the grids after the last frame
+    """
+    X = np.asarray(X)
+    assert X.ndim == 2
+    T = np.zeros(X.shape)
+    X = X.astype(bool)
+    Y = np.zeros_like(X)
+
+    with FrameEncoder(filename, X.shape, fire_palette(), scale, fps) as encoder:
+        for i in range(frames):
+            # A fresh index array per frame, so the step can update in place
+            encoder.write(fire_state_index(X, Y, T))
+            (X,Y,T) = life_step(X,Y,T)
+    return (X,Y,T)
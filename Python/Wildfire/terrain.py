@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Heterogeneous terrain, fuel and wind for the wildfire model
+
+Every cell gets a fuel load and a moisture, and the wind (one vector, or one
+vector per cell) makes fire spread faster downwind than upwind:
+
+* each burning neighbour counts for exp(strength * w.e) neighbours instead
+  of 1, where w is the wind at the burning cell and e the unit direction
+  from it to the cell that may catch fire
+* the rule of life_step_3 is then applied to that weighted count, and the
+  ignition probability is scaled by the flammability of the cell,
+  min(fuel, 1) * (1 - moisture).  Cells with no fuel never burn.
+* a cell burns for MAX_TIME * fuel steps instead of MAX_TIME
+
+With fuel 1, moisture 0 and no wind this is exactly life_step_4.
+
+The neighbour weights depend only on the wind, so they are computed once per
+wind state (8 numbers for a uniform wind, an (8, rows, cols) float32 stack
+for a wind field) and every step is a few whole-grid array operations.
+
+Wind vectors are in grid units, (rows, cols): (1, 0) blows towards higher
+row numbers (down the picture), (0, 1) towards higher column numbers.
+"""
+
+import numpy as np
+
+from wildfire import MAX_TIME, NEIGHBOURS
+
+def wind_kernels(wind, strength=1.0):
+    """Neighbour weights for a wind state
+
+    Parameters
+    ----------
+    wind : array_like
+        a (2,) wind vector, or a (rows, cols, 2) wind field
+    strength : float
+        how strongly the wind steers the fire
+
+    Returns
+    -------
+    weights : ndarray of float32
+        weights[d] is the weight of a burning cell at NEIGHBOURS[d] from the
+        cell that may catch fire, (8,) for a uniform wind or (8, rows, cols)
+        for a field, evaluated at the burning cell
+    """
+    wind = np.asarray(wind, dtype=float)
+    weights = []
+    for (i, j) in NEIGHBOURS:
+        # Spread goes from the burning neighbour at (i, j) back to the cell
+        e = -np.array([i, j]) / np.hypot(i, j)
+        weights.append(np.exp(strength * (wind @ e)))
+    return np.array(weights, dtype=np.float32)
+
+def smooth_noise(shape, scale, rng=None):
+    """Smooth random field in [0, 1], features about scale cells across"""
+    rng = rng if rng is not None else np.random.default_rng()
+    rows, cols = shape
+    coarse = rng.random((rows // scale + 2, cols // scale + 2))
+    # Bilinear interpolation of the coarse grid up to the full grid
+    r = np.arange(rows) / scale
+    c = np.arange(cols) / scale
+    r0, c0 = r.astype(int), c.astype(int)
+    fr, fc = (r - r0)[:, None], (c - c0)[None, :]
+    field = (coarse[r0][:, c0] * (1 - fr) * (1 - fc) + coarse[r0 + 1][:, c0] * fr * (1 - fc)
+             + coarse[r0][:, c0 + 1] * (1 - fr) * fc + coarse[r0 + 1][:, c0 + 1] * fr * fc)
+    field -= field.min()
+    return field / max(field.max(), 1e-12)
+
+class Landscape:
+    """Fuel, moisture and wind of every cell of a wildfire grid
+
+    Parameters
+    ----------
+    fuel : array_like
+        fuel load of every cell, 1 is the homogeneous forest and 0 cannot burn
+    moisture : array_like
+        moisture of every cell between 0 (dry) and 1 (cannot burn)
+    wind : array_like
+        a (2,) wind vector or a (rows, cols, 2) wind field
+    wind_strength : float
+        how strongly the wind steers the fire
+    """
+
+    def __init__(self, fuel, moisture=0.0, wind=(0.0, 0.0), wind_strength=1.0):
+        self.fuel = np.asarray(fuel, dtype=np.float32)
+        assert self.fuel.ndim == 2
+        moisture = np.broadcast_to(np.asarray(moisture, dtype=np.float32), self.fuel.shape)
+        self.flammability = (np.clip(self.fuel, 0, 1) * np.clip(1 - moisture, 0, 1)).astype(np.float32)
+        self.burn_time = (MAX_TIME * self.fuel).astype(np.float32)
+        self.wind_strength = wind_strength
+        self.set_wind(wind)
+
+    def set_wind(self, wind):
+        """Change the wind, recomputing the neighbour weights once"""
+        self.wind = np.asarray(wind, dtype=float)
+        self.weights = wind_kernels(self.wind, self.wind_strength)
+        self.uniform_wind = self.weights.ndim == 1
+
+    def weighted_count(self, X):
+        """Wind weighted number of burning neighbours of every cell"""
+        rows, cols = X.shape
+        count = np.zeros(X.shape, dtype=np.float32)
+        if self.uniform_wind:
+            P = np.pad(X, 1).astype(np.float32)
+            for w, (i, j) in zip(self.weights, NEIGHBOURS):
+                count += w * P[1+i:rows+1+i, 1+j:cols+1+j]
+        else:
+            for w, (i, j) in zip(self.weights, NEIGHBOURS):
+                P = np.pad(w * X, 1)
+                count += P[1+i:rows+1+i, 1+j:cols+1+j]
+        return count
+
+    def step(self, X, Y, T, rng=np.random):
+        """One wildfire step over this landscape, updating (X, Y, T) in place"""
+        count = self.weighted_count(X)
+        T[X] += 1.0
+        u = rng.uniform(0,1,X.shape)
+        p = np.where(count >= 3, 0.25, np.where(count >= 1, 0.001, 0.00001))
+        Xnew = (X | (u < self.flammability * p)) & ~Y & (T < self.burn_time)
+        Y |= (~Xnew) & X
+        X[...] = Xnew
+        return (X,Y,T)
+
+    def make_life_step(self, rng=np.random):
+        """A life_step(X,Y,T) function for this landscape"""
+        def life_step_terrain(X, Y, T):
+            return self.step(X, Y, T, rng)
+        return life_step_terrain
+
+def random_landscape(shape, wind=(0.0, 1.0), wind_strength=1.0, scale=50, seed=None):
+    """Landscape with patchy fuel and moisture and a uniform wind"""
+    rng = np.random.default_rng(seed)
+    fuel = 0.3 + 1.2 * smooth_noise(shape, scale, rng)
+    moisture = 0.6 * smooth_noise(shape, scale, rng)
+    # A few bare patches (rock, lakes) that cannot burn
+    fuel[smooth_noise(shape, scale, rng) > 0.9] = 0.0
+    return Landscape(fuel, moisture, wind, wind_strength)
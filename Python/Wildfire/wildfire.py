@@ -56,7 +56,34 @@ def life_step_3(X,Y,T):
 
     return (X,Y,T)
 
-life_step = life_step_3
+# Offsets of the 8 neighbours of a cell
+NEIGHBOURS = [ (-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1) ]
+
+def burning_neighbours(X):
+    """Number of burning neighbours of every cell, nothing burns off the edge"""
+    rows, cols = X.shape
+    P = np.pad(X, 1).astype(np.uint8)
+    return sum(P[1+i:rows+1+i, 1+j:cols+1+j] for (i,j) in NEIGHBOURS)
+
+def life_step_4(X,Y,T,rng=np.random):
+    """Vectorized version of life_step_3
+
+    Same rule and same in-place update of (X, Y, T), but the neighbour counts
+    come from zero-padded shifts of the whole board and all the random numbers
+    are drawn in one call.  The draws are in the same row-major order as the
+    per-cell calls in life_step_3, so with the same seed both give the same fire.
+    rng can be a np.random.Generator to use instead of the global np.random.
+    """
+    count = burning_neighbours(X)
+    T[X] += 1.0
+    u = rng.uniform(0,1,X.shape)
+    Xnew = ((X | ((count >= 3) & (u < 0.25)) | ((count >= 1) & (u < 0.001)) | (u < 0.00001))
+            & (count < 9) & ~Y & (T < MAX_TIME))
+    Y |= (~Xnew) & X
+    X[...] = Xnew
+    return (X,Y,T)
+
+life_step = life_step_4
 
 # Commented out IPython magic to ensure Python compatibility.
 # %pylab inline
@@ -131,33 +158,55 @@ def life_animation(X, dpi=10, frames=10, interval=300, mode='loop'):
     anim.save('basic_animation.mp4', fps=10, extra_args=['-vcodec', 'libx264'])
     return HTML(anim.to_html5_video())
 
-# http://jakevdp.github.io/blog/2013/08/07/conways-game-of-life/
-np.random.seed(0)
-#X = np.zeros((30, 40), dtype=bool)
-X = np.zeros((100, 100))
-#X[1:4, 1:4] = [[0, 0, 1],
-#               [1, 0, 1],
-#               [0, 1, 1]]
-#X[48:51, 48:51] = [[0, 1, 1],
-#                   [1, 1, 0],
-#                   [0, 1, 0]]
-#X[48:51, 48:55] = [[0, 1, 0, 0, 0, 0, 0],
-#                   [0, 0, 0, 1, 0, 0, 0],
-#                   [1, 1, 0, 0, 1, 1, 1]]
-#X[49:50,20:80] = 1
-#X = [[0, 0, 0, 0, 0],
-#     [0, 0, 1, 0, 0],
-#     [0, 0, 1, 0, 0],
-#     [0, 0, 1, 0, 0],
-#     [0, 0, 0, 0, 0]]
-X = np.array(X)
-#X.shape
-#r = np.random.random((10, 20))
-#X[10:20, 10:30] = (r > 0.75)
-#life_animation(X, dpi=50, frames=400, mode='once', interval=100)
-life_animation(X, dpi=50, frames=400, mode='once', interval=100)
-
-plt.show()
+# Only run the demo when executed as a script, so the kernels can be imported
+if __name__ == '__main__':
+    # http://jakevdp.github.io/blog/2013/08/07/conways-game-of-life/
+    np.random.seed(0)
+    #X = np.zeros((30, 40), dtype=bool)
+    X = np.zeros((100, 100))
+    #X[1:4, 1:4] = [[0, 0, 1],
+    #               [1, 0, 1],
+    #               [0, 1, 1]]
+    #X[48:51, 48:51] = [[0, 1, 1],
+    #                   [1, 1, 0],
+    #                   [0, 1, 0]]
+    #X[48:51, 48:55] = [[0, 1, 0, 0, 0, 0, 0],
+    #                   [0, 0, 0, 1, 0, 0, 0],
+    #                   [1, 1, 0, 0, 1, 1, 1]]
+    #X[49:50,20:80] = 1
+    #X = [[0, 0, 0, 0, 0],
+    #     [0, 0, 1, 0, 0],
+    #     [0, 0, 1, 0, 0],
+    #     [0, 0, 1, 0, 0],
+    #     [0, 0, 0, 0, 0]]
+    X = np.array(X)
+    #X.shape
+    #r = np.random.random((10, 20))
+    #X[10:20, 10:30] = (r > 0.75)
+
+    # Frontier-only propagation, the cost follows the fire perimeter
+    #from frontier import make_life_step_frontier
+    #life_step = make_life_step_frontier()
+
+    # Patchy fuel and moisture with a wind blowing to the right
+    #from terrain import random_landscape
+    #life_step = random_landscape(X.shape, wind=(0.0, 1.0), seed=0).make_life_step()
+
+    # life_step_3 compiled with numba, rows spread over all cores
+    #from numbafire import make_life_step_numba
+    #life_step = make_life_step_numba(seed=0)
+
+    #life_animation(X, dpi=50, frames=400, mode='once', interval=100)
+    life_animation(X, dpi=50, frames=400, mode='once', interval=100)
+    # Streams frames straight to the encoder, much faster than life_animation
+    #from render import fire_render
+    #fire_render(X, life_step, frames=400, scale=8, fps=10)
+    # Long runs without pictures that can be stopped and picked up again
+    #from checkpoint import fire_run_checkpointed
+    #(X, Y, T) = fire_run_checkpointed(X, steps=400, filename='wildfire_checkpoint.npz')
+
+    plt.show()
+
 #!pip uninstall JSAnimation
 #!pip uninstall matplotlib -y
 